@@ -0,0 +1,60 @@
+from array import array
+from collections import OrderedDict
+
+BUDGET = 4 << 20  # bytes of frames kept across all animations
+LOW_MEMORY = 16 << 20  # below this much free system memory nothing is kept
+
+_tables = OrderedDict()  # key -> frames, least recently used first
+_sizes = {}
+
+
+def memAvailable():
+    """Free system memory in bytes, or None where /proc/meminfo doesn't exist"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if(line.startswith("MemAvailable:")):
+                    return int(line.split()[1])*1024
+    except OSError:
+        pass
+    return None
+
+
+def get(key, period, renderFrame):
+    """Returns the <period> frames of a periodic, deterministic animation as a list
+    of color arrays, calling renderFrame(i) for each frame only the first time
+    <key> is asked for. Least recently used animations are dropped to stay under
+    BUDGET, and everything is dropped when the system runs low on memory."""
+    if(trim()):
+        return [array('I', renderFrame(i)) for i in range(period)]  # played, not kept
+    if(key in _tables):
+        _tables.move_to_end(key)
+        return _tables[key]
+    frames = [array('I', renderFrame(i)) for i in range(period)]
+    size = sum(len(f)*f.itemsize for f in frames)
+    while(_tables and sum(_sizes.values())+size > BUDGET):
+        evict(next(iter(_tables)))
+    if(size <= BUDGET):
+        _tables[key] = frames
+        _sizes[key] = size
+    return frames
+
+
+def trim():
+    """Drops every table if the system is low on memory, returning whether it is.
+    get() checks on every call, mainLoop also checks between modes."""
+    free = memAvailable()
+    if(free is not None and free < LOW_MEMORY):
+        clear()
+        return True
+    return False
+
+
+def evict(key):
+    _tables.pop(key, None)
+    _sizes.pop(key, None)
+
+
+def clear():
+    _tables.clear()
+    _sizes.clear()
@@ -0,0 +1,73 @@
+import importlib
+import os
+import time
+
+started = time.monotonic()  # startup times are measured from here
+
+CONFIG_FILE = "ledBoard.conf"  # "key = value" lines, '#' starts a comment
+modeBtn = (0, 0)  # key that leaves the current mode, on every backend
+
+registry = {
+    "real": "realGrid",
+    "tk": "tKinterGrid",
+    "null": "nullGrid",
+    "shm": "shmGrid",  # modes in their own process, see shmBoard
+}
+timings = {}  # startup step -> seconds it took
+grid = None  # the loaded backend module
+
+
+def register(name, moduleName):
+    """Makes the backend module <moduleName> selectable as <name>"""
+    registry[name] = moduleName
+
+
+def readConfig(path=CONFIG_FILE):
+    config = {}
+    if(os.path.exists(path)):
+        with open(path) as f:
+            for line in f:
+                line = line.split("#")[0]
+                if("=" in line):
+                    key, value = line.split("=", 1)
+                    config[key.strip()] = value.strip()
+    return config
+
+
+def selected():
+    """Name of the backend to use: $LEDBOARD_BACKEND, then the config file,
+    then the old realBoardFlag file, falling back to the tkinter emulator"""
+    name = os.environ.get("LEDBOARD_BACKEND") or readConfig().get("backend")
+    if(name):
+        return name
+    return "real" if os.path.exists("realBoardFlag") else "tk"
+
+
+def load(name=None):
+    """Imports and returns the backend, only the first call picks which one.
+    Backends don't touch hardware until their startup() is called."""
+    global grid
+    if(grid is None):
+        name = name or selected()
+        if(name not in registry):
+            raise ValueError("unknown backend {!r}, expected one of {}".format(
+                name, ", ".join(registry)))
+        t = time.monotonic()
+        grid = importlib.import_module(registry[name])
+        timings["import backend"] = time.monotonic()-t
+    return grid
+
+
+def startup():
+    """Runs the backend's startup(), timing it for the startup report"""
+    t = time.monotonic()
+    grid.startup()
+    timings["backend startup"] = time.monotonic()-t
+
+
+def startupReport(firstFrame):
+    """Formats how long each startup step took, and the time from this module's
+    import to the monotonic time <firstFrame> the first frame was shown"""
+    steps = ["{} {:.0f}ms".format(step, t*1000) for step, t in timings.items()]
+    steps.append("first frame after {:.0f}ms".format((firstFrame-started)*1000))
+    return "Startup: " + ", ".join(steps)
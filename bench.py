@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Runs each mode in boardV2.modes on the headless nullGrid backend with scripted
+key presses and reports frame rate, p50/p99 frame time and memory allocated per
+frame. Modes run on a virtual clock, so the numbers are pure compute time.
+
+    python3 bench.py [--frames N] [--seed N] [mode ...]
+"""
+import argparse
+import random
+import socket
+import time
+import tracemalloc
+
+import backends
+backends.load("null")  # before boardV2 picks up the configured backend
+import boardV2
+import clock
+import modeRuntime
+import nullGrid
+import udpStream
+
+
+def pressScript(frames, seed, pressRate=.3, holdFor=4):
+    """Returns a nullGrid key script that randomly presses and holds keys, then
+    presses the mode button once <frames> frames have been shown"""
+    rng = random.Random(seed)
+    held = {}  # key -> calls left held
+
+    def script(call):
+        if(nullGrid.frameCount >= frames):
+            return ([boardV2.modeBtn], [boardV2.modeBtn])
+        for key in list(held):
+            held[key] -= 1
+            if(held[key] == 0):
+                del held[key]
+        newKeys = []
+        if(rng.random() < pressRate):
+            key = (rng.randrange(8), rng.randrange(8))
+            if(key != boardV2.modeBtn):
+                newKeys.append(key)
+                held[key] = holdFor
+        return (newKeys, list(held))
+    return script
+
+
+def freePort():
+    """A UDP port nothing on loopback is using right now"""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def streamScript(script, seed):
+    """Wraps key script <script> to also send the stream mode a random 8x8
+    frame to udpStream's HOST and PORT on every call"""
+    rng = random.Random(seed)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    seq = [0]
+
+    def feed(call):
+        seq[0] = seq[0] % 15+1
+        frame = [rng.randrange(1 << 24) for __ in range(64)]
+        for packet in udpStream.packets(frame, seq[0]):
+            sock.sendto(packet, (udpStream.HOST, udpStream.PORT))
+        return script(call)
+    return feed
+
+
+def percentile(data, p):
+    data = sorted(data)
+    return data[min(int(len(data)*p), len(data)-1)]
+
+
+def runMode(mode, frames, seed, traceAllocs):
+    """Runs <mode> until it has shown <frames> frames, returning the time each
+    frame took and the bytes allocated during each"""
+    times = []
+    allocs = []
+    last = [time.perf_counter()]
+
+    def onShow():
+        now = time.perf_counter()
+        times.append(now-last[0])
+        if(traceAllocs):
+            current, peak = tracemalloc.get_traced_memory()
+            allocs.append(peak-last[1])
+            tracemalloc.reset_peak()
+            last[1] = tracemalloc.get_traced_memory()[0]
+            now = time.perf_counter()
+        last[0] = now
+
+    nullGrid.frameCount = 0
+    nullGrid.keyCalls = 0
+    nullGrid.keyScript = pressScript(frames, seed)
+    if(mode is boardV2.stream):
+        # only on loopback, on a port no real sender is streaming to
+        udpStream.HOST = "127.0.0.1"
+        udpStream.PORT = freePort()
+        nullGrid.keyScript = streamScript(nullGrid.keyScript, seed)
+    nullGrid.onShow = onShow
+    clock.rng.seed(seed)
+    if(traceAllocs):
+        tracemalloc.start()
+        last.append(tracemalloc.get_traced_memory()[0])
+    try:
+        modeRuntime.Runtime(nullGrid).run(mode())
+    finally:
+        if(traceAllocs):
+            tracemalloc.stop()
+        nullGrid.onShow = None
+    return times, allocs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark board modes headless")
+    parser.add_argument("modes", nargs="*", help="mode names, defaults to all of boardV2.modes")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    modes = [m for m in boardV2.modes if not args.modes or m.__name__ in args.modes]
+    clock.use(clock.VirtualClock())
+    print("{:<12}{:>8}{:>10}{:>10}{:>10}{:>14}".format(
+        "mode", "frames", "fps", "p50 ms", "p99 ms", "alloc KiB/f"))
+    for mode in modes:
+        times, __ = runMode(mode, args.frames, args.seed, False)
+        __, allocs = runMode(mode, args.frames, args.seed, True)
+        print("{:<12}{:>8}{:>10.0f}{:>10.3f}{:>10.3f}{:>14.2f}".format(
+            mode.__name__, len(times), len(times)/sum(times),
+            percentile(times, .5)*1000, percentile(times, .99)*1000,
+            sum(allocs)/len(allocs)/1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,34 +4,31 @@
 # Direct port of the Arduino NeoPixel library strandtest example.  Showcases
 # various animations on a strip of NeoPixels.
 
-import random
 import threading
 import time
-from math import floor, sqrt
-from os.path import exists as file_exists
+from math import floor
 
+import animCache
+import backends
+import clock
+import colorTables
+import compositor
 import font
-
-realBoard = False
-if(file_exists("realBoardFlag")):
-    import realGrid as grid
-    realBoard = True
-else:
-    import tKinterGrid as grid
-
-
-def rgbColor(r, g, b):
-    return (r << 16)+(g << 8)+b
-
-
-colors = {
-    "red": rgbColor(255, 0, 0),
-    "green": rgbColor(0, 255, 0),
-    "blue": rgbColor(0, 0, 255),
-    "white": rgbColor(200, 200, 200),
-    "orange": rgbColor(240, 131, 29),
-    "off": 0
-}
+import frameBuffer
+import frameSched
+import heatEngine
+import lifeEngine
+import modeRuntime
+import recorder
+import stats
+import tttEngine
+import udpStream
+import waveEngine
+from colorTables import colors, rgbColor
+
+backend = backends.load()
+# modes draw the background layer, scores and transitions go on grid.overlay
+grid = compositor.Compositor(backend)
 
 colList = []
 colList.append(0)  # Black
@@ -40,254 +37,195 @@ colList.append(rgbColor(0, 255, 0))  # green
 colList.append(rgbColor(0, 0, 255))  # blue
 colList.append(rgbColor(200, 200, 0))  # yellow-green
 colList.append(rgbColor(255, 140, 10))  # orange
-colList.append(rgbColor(200, 200, 200))  # white
+colList.append(rgbColor(255, 255, 255))  # white
 colList.append(rgbColor(255, 0, 200))  # violet
 
-redMask = 0xFF << 16
-greenMask = 0xFF << 8
-blueMask = 0xFF
-
-modeBtn = (0, 0)
+modeBtn = backends.modeBtn
+WIDTH = frameBuffer.WIDTH
+HEIGHT = frameBuffer.HEIGHT
 
 # util functions for drawing
 
 
-def sumColors(a, b):
-    """sums two colors togeather, adding R, G, and B seperatly"""
-    rSum = min((a & redMask) + (b & redMask), redMask)
-    gSum = min((a & greenMask) + (b & greenMask), greenMask)
-    bSum = min((a & blueMask) + (b & blueMask), blueMask)
-    return rSum + gSum + bSum
-
-
-def multColor(col, mult):
-    """multiplies the RGB color by a scalar, designed for multiples < 1"""
-    rVal = min(int((col & redMask) * mult), redMask) & redMask
-    gVal = min(int((col & greenMask) * mult), greenMask) & greenMask
-    bVal = min(int((col & blueMask) * mult), blueMask) & blueMask
-    return rVal+gVal+bVal
-
-
-def heatCol(amt):
-    """converts 0-255 'heat' value to a RGB value"""
-    red = int(min(amt*1.5, 255))
-    green = max(2*amt-300, 0)
-    blue = int(max(255-2*amt, 0)+green)
-    return (red << 16)+(green << 8)+blue
-
-
 def testHeat():
     """displays the heat gradient as a test"""
-    for x in range(8):
-        for y in range(8):
-            grid.drawPixel(x, y, heatCol(x*32))
-
-
-def wheel(pos):
-    """Generate rainbow colors across 0-255 positions."""
-    if pos < 85:
-        return rgbColor(pos * 3, 255 - pos * 3, 0)
-    elif pos < 170:
-        pos -= 85
-        return rgbColor(255 - pos * 3, 0, pos * 3)
-    else:
-        pos -= 170
-        return rgbColor(0, pos * 3, 255 - pos * 3)
+    for x in range(WIDTH):
+        for y in range(HEIGHT):
+            grid.drawPixel(x, y, colorTables.heatLut[x*256//WIDTH])
 
 
 def clearDown(t=.2):
     """wipes the screen from top to bottom, waiting <t> between each row"""
-    for y in range(8):
-        for x in range(8):
-            grid.drawPixel(x, 7-y, 0)
-        time.sleep(t)
-
-
-def transition(col, interval=1/15):
-    """Gradually paints a square <col> filling the board, starting at mode btn"""
-    for i in range(8):
-        for x in range(i):
-            grid.drawPixel(x, i, col)
-        for y in range(i+1):
-            grid.drawPixel(i, y, col)
+    for y in range(HEIGHT):
+        for x in range(WIDTH):
+            grid.drawPixel(x, HEIGHT-1-y, 0)
+        yield t
+
+
+def transition(col, interval=1/15, surface=None):
+    """Gradually paints a square <col> filling the board, starting at mode btn.
+    Paints <surface>, e.g. grid.overlay, instead of the background if given"""
+    surface = surface or grid
+    for i in range(max(WIDTH, HEIGHT)):
+        if(i < HEIGHT):
+            for x in range(min(i, WIDTH)):
+                surface.drawPixel(x, i, col)
+        if(i < WIDTH):
+            for y in range(min(i+1, HEIGHT)):
+                surface.drawPixel(i, y, col)
+        grid.stripShow()
+        yield interval
+
+
+def showScore(num, col, t):
+    """shows <num> over a dimmed board for <t> seconds, scrolling it if it's
+    over 99, on the overlay so the frame underneath is still there afterwards"""
+    try:
+        yield from font.scrollText("{:02d}".format(num), col, grid.overlay, t, dim=208)
+    finally:
+        grid.overlay.clear()
         grid.stripShow()
-        time.sleep(interval)
-# Define functions which animate LEDs in various ways.
 
 
-def calcWavePoint(grid, point):
-    """Adds the wave values for a specific seed point, outputing back to grid"""
-    for y, row in enumerate(grid):
-        for x, val in enumerate(row):
-            err = sqrt((point[0]-x)**2+(point[1]-y)**2)-point[2]
-            weightErr = .65-.8*err**2
-            mult = max(0, max(min(weightErr, 1), 0))
-            # add the color, multiplied by ramping
-            grid[y][x] = sumColors(val, multColor(point[3], mult))
+def fadeOverlay(t=.4, interval=1/40):
+    """fades the overlay out over <t> seconds while the mode keeps running under it"""
+    steps = round(t/interval)
+    try:
+        for i in range(steps, 0, -1):
+            grid.overlay.setOpacity(255*i//steps)
+            grid.stripShow()
+            yield interval
+    finally:
+        grid.overlay.clear()
+        grid.overlay.setOpacity(255)
+        grid.stripShow()
+# Define functions which animate LEDs in various ways.
+# Modes are generators run by modeRuntime, see there for how they yield.
 
 
 def wave():
     """creates circular waves that mova away from a button press"""
-    seedPoints = []
-    drawInterval = 1/15
+    engine = waveEngine.WaveEngine(WIDTH, HEIGHT)
 
     while(True):
-        nextDrawTime = time.time()+drawInterval
-        # 8x8 grid, rgb vals for each pixel
-        pixelGrid = [[0 for x in range(8)] for y in range(8)]
-        kDownEvents = grid.readKeys()[0]
-
-        if modeBtn in kDownEvents:
-            return  # go back to mode switch
-
-        for key in kDownEvents:
-            col = colList[random.randint(1, len(colList)-1)]
-            seedPoints.append([key[0], key[1], 0.0, col])  # add
-            kDownEvents.remove(key)
-        for i, seed in enumerate(seedPoints):
-            if seed[2] > 10:
-                seedPoints.remove(seed)
-                continue
-            seedPoints[i][2] = seedPoints[i][2]*1.03+.14
-            calcWavePoint(pixelGrid, seedPoints[i])
-        grid.drawGrid(pixelGrid)
+        kDownEvents, __ = yield 1/15
 
-        while(time.time() < nextDrawTime):
-            pass
+        for x, y in kDownEvents:
+            engine.addSeed(x, y, colList[clock.rng.randint(1, len(colList)-1)])
+        grid.drawFrame(engine.step())
 
 
 def pressCol():
     """Cycles through list of colors when a button is pressed"""
-    drawInterval = 1/40
-    # 8x8 grid, color index for each pixel
-    pixelGrid = [[0 for x in range(8)] for y in range(8)]
+    # color for each pixel, [y][x]
+    pixelGrid = [[0 for x in range(WIDTH)] for y in range(HEIGHT)]
     while(True):
-        nextDrawTime = time.time()+drawInterval
-        kDownEvents = grid.readKeys()[0]
-        if(modeBtn in kDownEvents):
-            return
+        kDownEvents, __ = yield 1/40
         for x, y in kDownEvents:
             colInd = colList.index(pixelGrid[y][x])  # get current col ind
             colInd = (colInd + 1) % len(colList)  # increment color ind
             pixelGrid[y][x] = colList[colInd]  # set new color
         grid.drawGrid(pixelGrid)
-        while(time.time() < nextDrawTime):
-            pass
 
 
 def holdCol():
     """cycles through color wheel while button is held"""
-    drawInterval = 1/40
-    # 8x8 grid, rgb vals for each pixel
-    pixelGrid = [[0 for x in range(8)] for y in range(8)]
+    lut = colorTables.wheelLut
+    # color wheel position for each pixel (index y*WIDTH+x)
+    wheelPos = bytearray(WIDTH*HEIGHT)
     while(True):
-        nextDrawTime = time.time()+drawInterval
-
-        heldKeys = grid.readKeys()[1]
-        if(modeBtn in heldKeys):
-            return
+        __, heldKeys = yield 1/40
         for x, y in heldKeys:  # find new key presses
-            pixelGrid[y][x] = (pixelGrid[y][x]+3) & 255
-        for y, row in enumerate(pixelGrid):
-            for x, val in enumerate(row):
-                grid.drawPixel(x, y, multColor(wheel(val), .7))
-        grid.stripShow()
-        while(time.time() < nextDrawTime):
-            pass
+            wheelPos[y*WIDTH+x] = (wheelPos[y*WIDTH+x]+3) & 255
+        grid.drawFrame([lut[val] for val in wheelPos])
+
+
+def rainbowFrame(step):
+    """One frame of the rainbow animation, the offset steps by 2 so it repeats every 128"""
+    rainbowOffset = (step*2 + 2) & 0xFF
+    frame = []
+    for i in range(HEIGHT):
+        frame += [colorTables.wheelLut[(i*256//HEIGHT+rainbowOffset) & 255]]*WIDTH
+    return frame
 
 
 def rainbow(wait_ms=20, iterations=1):
     """Draw rainbow that fades across all pixels at once."""
-    drawInterval = 1/40
-    rainbowOffset = 0
+    frames = animCache.get("rainbow", 128, rainbowFrame)
+    step = 0
     while(True):
-        nextDrawTime = time.time()+drawInterval
+        yield 1/40
+        grid.drawFrame(frames[step])
+        step = (step + 1) % len(frames)
 
-        k = grid.readKeys()[1]
-        if(modeBtn in k):
-            return
 
-        rainbowOffset = (rainbowOffset + 2) & 0xFF
-        for i in range(8):
-            col = wheel((i*32+rainbowOffset) & 255)
-            for j in range(8):
-                grid.drawPixel(j, i, col)
-        grid.stripShow()
-        while(time.time() < nextDrawTime):
-            pass
+def rainbowFineFrame(step):
+    """One frame of the full resolution rainbow, addressed by physical LED, each
+    of the strip runs a band of color"""
+    rainbowOffset = (step*2 + 2) & 0xFF
+    frame = []
+    for i in range(frameBuffer.LED_LINES):
+        frame += [colorTables.wheelLut[(i*256//frameBuffer.LED_LINES+rainbowOffset) & 255]]*frameBuffer.LED_COLS
+    return frame
 
 
 def rainbowFine(wait_ms=20, iterations=1):
     """Fades through a rainbow linearly,with full led resolution"""
-    drawInterval = 1/40
-    rainbowOffset = 0
+    frames = animCache.get("rainbowFine", 128, rainbowFineFrame)
+    step = 0
     while(True):
-        nextDrawTime = time.time()+drawInterval
-
-        k = grid.readKeys()[1]
-        if(modeBtn in k):
-            return
-
-        rainbowOffset = (rainbowOffset + 2) & 0xFF
-        for i in range(16):
-            col = wheel((i*16+rainbowOffset) & 255)
-            for j in range(24):
-                grid.setLED(i*24+j, col)
-        grid.stripShow()
-        while(time.time() < nextDrawTime):
-            pass
+        yield 1/40
+        grid.drawCanvas(frames[step])
+        step = (step + 1) % len(frames)
 
 
 def heatMap():
     """Turns board into heatmap, pushing a button 'heats' it, then disperses to neighbors"""
-    pixelGrid = [[0 for x in range(8)] for y in range(
-        8)]  # 8x8 grid, rgb vals for each pixel
-    # list of adjacent pixels for each pixel
-    adjGrid = [[[] for __ in range(8)] for __ in range(8)]
-    for y in range(8):
-        for x in range(8):
-            if(0 <= x+1 < 8 and 0 <= y < 8):
-                adjGrid[y][x].append((x+1, y))
-            if(0 <= x-1 < 8 and 0 <= y < 8):
-                adjGrid[y][x].append((x-1, y))
-            if(0 <= x < 8 and 0 <= y+1 < 8):
-                adjGrid[y][x].append((x, y+1))
-            if(0 <= x < 8 and 0 <= y-1 < 8):
-                adjGrid[y][x].append((x, y-1))
-
-    cHeatTrans = .15  # constant for heat transfer between cells
-    cHeatLoss = 0.99  # heat lost per cell per loop
-    cHeatAdd = .1  # heat added per button per loop
-    transition(heatCol(0), 1/20)
-    drawInterval = 1/20
+    engine = heatEngine.HeatEngine(WIDTH, HEIGHT, colorTables.heatLut)
+    yield from transition(colorTables.heatLut[0], 1/20)
     while(True):
-        nextDrawTime = time.time()+drawInterval
-
-        heldKeys = grid.readKeys()[1]
-        if(modeBtn in heldKeys):
-            return
+        __, heldKeys = yield 1/20
         for x, y in heldKeys:
-            pixelGrid[y][x] += cHeatAdd*(1000-pixelGrid[y][x])
-        newGrid = pixelGrid.copy()
-
-        # calculate heat transfer
-        for y in range(8):
-            for x in range(8):
-                for ax, ay in adjGrid[y][x]:
-                    # weighted average with neighbor
-                    newGrid[y][x] += cHeatTrans * \
-                        (pixelGrid[ay][ax] - pixelGrid[y][x])
-                # gradually loose heat, to prevent saturation
-                newGrid[y][x] *= cHeatLoss
-                newGrid[y][x] = min(max(0, newGrid[y][x]), 255)
-                grid.drawPixel(x, y, heatCol(round(newGrid[y][x])))
-        pixelGrid = newGrid
-        grid.stripShow()
-        # for row in newGrid:
-        #     print(" ".join(["{:02X}".format(int(round(i))) for i in row]))
+            engine.heat(x, y)
+        engine.step()
+        grid.drawFrame(engine.render())
+
+
+# the life mode's rule presets in the order it goes through them, see lifeEngine
+lifePresets = [("life", rgbColor(0, 255, 0)), ("highlife", colors["orange"]),
+               ("day & night", rgbColor(0, 80, 255)), ("maze", rgbColor(200, 200, 0)),
+               ("seeds", rgbColor(255, 0, 200))]
+
 
-        while(time.time() < nextDrawTime):
-            pass
+def life(lifetime=60):
+    """Runs Conway's Life on a random board, pressing a button toggles that cell.
+    Once the board dies out, settles into a short loop or has run <lifetime>
+    seconds it's reseeded with the next rule preset"""
+    engine = lifeEngine.LifeEngine(WIDTH, HEIGHT)
+    preset = -1
+    history = []  # the last few boards, to spot still lifes and oscillators
+    while(True):
+        if(not history):
+            preset = (preset+1) % len(lifePresets)
+            name, col = lifePresets[preset]
+            engine.setRule(name)
+            engine.setColors(col)
+            engine.randomize(clock.rng)
+            started = clock.now()
+            history.append(engine.board)
+        grid.drawFrame(engine.render())
+        kDownEvents, __ = yield 1/8
+        for x, y in kDownEvents:
+            engine.toggle(x, y)
+        if(kDownEvents):
+            history = [engine.board]
+            started = clock.now()
+            continue
+        engine.step()
+        if(not engine.board or engine.board in history or clock.now()-started > lifetime):
+            history = []
+            continue
+        history = history[-11:]+[engine.board]
 
 
 def simon():
@@ -301,25 +239,23 @@ def simon():
     simonSequence = []
     while(True):  # looping until modeBtn
         restart = False
-        time.sleep(.5)
+        yield .5
         grid.setCol()
-        simonSequence.append((random.randint(0, 1), random.randint(0, 1)))
+        simonSequence.append((clock.rng.randint(0, 1), clock.rng.randint(0, 1)))
         # showing the sequence
         for cx, cy in simonSequence:
             [grid.drawPixel(cx*4 + x+1-cx, cy*4 + y+1-cy, sColors[cy*2+cx])
              for x in range(3) for y in range(3)]
             grid.stripShow()
-            time.sleep(.4)
+            yield .4
             grid.setCol(c=0)
             grid.stripShow()
-            time.sleep(.2)
+            yield .2
         for cx, cy in simonSequence:
             # waiting for keypress
             while(True):
-                keys = grid.readKeys()[0]
+                keys, __ = yield 1/40
                 if(keys):
-                    if(modeBtn in keys):
-                        return
                     # lose if key not in right region
                     x, y = keys[0]
                     if(floor(x/4) != cx or floor(y/4) != cy):
@@ -329,166 +265,192 @@ def simon():
                         [grid.drawPixel(cx*4 + x, cy*4 + y, sColors[cy*2+cx])
                          for x in range(4) for y in range(4)]
                         grid.stripShow()
-                        time.sleep(.5)
+                        yield .5
                         grid.setCol(0)
                         grid.stripShow()
                         break
             if(restart):  # break for loop
                 break
         if(restart):  # restart game
-            time.sleep(.7)
+            yield .7
             cx, cy = simonSequence[-1]
             [grid.drawPixel(cx*4 + x+1-cx, cy*4 + y+1-cy, sColors[cy*2+cx])
              for x in range(3) for y in range(3)]
             grid.stripShow()
-            time.sleep(.6)
-            grid.setCol()
-            font.drawNum(len(simonSequence)-1, colors["red"])
-            grid.stripShow()
-            time.sleep(1.5)
+            yield .6
+            yield from showScore(len(simonSequence)-1, colors["red"], 1.5)
             simonSequence = []
 
 
-def paintTTT(tGrid):
-    for x, row in enumerate(tGrid):
-        for y, val in enumerate(row):
-            col = "off" if val == 0 else ("red" if val == 1 else "blue")
-            grid.drawPixel(x*3, y*3, colors[col])
-            grid.drawPixel(x*3+1, y*3, colors[col])
-            grid.drawPixel(x*3, y*3+1, colors[col])
-            grid.drawPixel(x*3+1, y*3+1, colors[col])
+def paintTTT(boards):
+    """paints the 3x3 cells, <boards> is the (red, blue) pair of cell bitmasks"""
+    for cell in range(9):
+        x, y = cell % 3, cell//3
+        col = "red" if boards[0] >> cell & 1 else ("blue" if boards[1] >> cell & 1 else "off")
+        grid.drawPixel(x*3, y*3, colors[col])
+        grid.drawPixel(x*3+1, y*3, colors[col])
+        grid.drawPixel(x*3, y*3+1, colors[col])
+        grid.drawPixel(x*3+1, y*3+1, colors[col])
 
 
 plrWins = [0, 0, 0]
+tttAI = None  # solved 3x3 engine, built the first time the AI mode runs
 
 
-def checkWin(tGrid, winSets):
-    """count of wins for each player, index 0 is draws"""
-
-    for test in winSets:
-        cols = []
-        for x, y in test:
-            cols.append(tGrid[x][y])
-        if(cols[0] != 0 and cols[0] == cols[1] and cols[0] == cols[2]):
-            soln = test
-            wCol = cols[0]
-            break
-    else:
+def checkWin(line, wCol):
+    """count of wins for each player, index 0 is draws. Flashes the winning
+    <line> of player <wCol> (1 or 2) and shows their score, if the move won"""
+    if(not line):
         return False
-    wGrid = [[0, 0, 0] for __ in range(3)]
-    blank = [[0, 0, 0] for __ in range(3)]
-    for x, y in soln:
-        wGrid[x][y] = wCol
+    wBoards = (line, 0) if wCol == 1 else (0, line)
     for i in range(3):
-        paintTTT(wGrid)
+        paintTTT(wBoards)
         grid.stripShow()
-        time.sleep(.3)
-        paintTTT(blank)
+        yield .3
+        paintTTT((0, 0))
         grid.stripShow()
-        time.sleep(.3)
-    time.sleep(.3)
+        yield .3
+    yield .3
     plrWins[wCol] += 1
     col = "red" if wCol == 1 else "blue"
-    grid.setCol()
-    font.drawNum(plrWins[wCol], colors[col])
-    grid.stripShow()
-    time.sleep(1)
+    yield from showScore(plrWins[wCol], colors[col], 1)
     return True
 
 
-def tictactoe():
-    drawInterval = 1/20
+def tictactoe(engine=None):
+    """two players take turns on the same board, or blue is played by <engine>"""
     global plrWins
     plrWins = [0, 0, 0]
-    winSets = []
-    winSets.append([(0, 0), (1, 1), (2, 2)])
-    winSets.append([(2, 0), (1, 1), (0, 2)])
-    for i in range(3):
-        winSets.append([(0, i), (1, i), (2, i)])
-        winSets.append([(i, 0), (i, 1), (i, 2)])
+    game = engine or tttEngine.Engine()
 
-    plrToggle = 1
     while(True):
-        tGrid = [[0, 0, 0] for __ in range(3)]
-        bttnCount = 0
+        game.reset(game.turn)  # whoever would be next starts the next game
         for i in range(8):
             grid.drawPixel(i, 2, colors["white"])
             grid.drawPixel(i, 5, colors["white"])
             grid.drawPixel(2, i, colors["white"])
             grid.drawPixel(5, i, colors["white"])
-        paintTTT(tGrid)
+        paintTTT(game.boards)
         grid.stripShow()
-        grid.readKeys()  # consume input
+        yield 0  # consume input
         while(True):
-            nextDrawTime = time.time()+drawInterval
-            newKeys = grid.readKeys()[0]
-            if(len(newKeys) > 0):
+            if(engine is not None and game.turn == 1):
+                yield .4
+                cell = game.reply()
+            else:
+                newKeys, __ = yield 1/20
+                if(len(newKeys) == 0):
+                    continue
                 x, y = newKeys[0]
-                if((x, y) == modeBtn):
-                    return
                 if(x in (2, 5) or y in (2, 5)):
                     continue
-                x = floor(x/3)
-                y = floor(y/3)
-                # print(x,y)
-                if(tGrid[x][y] == 0):
-                    tGrid[x][y] = plrToggle
-                    plrToggle = 1 if plrToggle == 2 else 2
-                    bttnCount += 1
-                paintTTT(tGrid)
-                grid.stripShow()
-                if(checkWin(tGrid, winSets)):
-                    break
-                if(bttnCount == 9):
-                    time.sleep(.6) 
-                    grid.setCol()
-                    plrWins[0] += 1
-                    font.drawNum(plrWins[0], colors["white"])
-                    grid.stripShow()
-                    time.sleep(1) 
-                    break
-            while(time.time() < nextDrawTime):
-                pass
+                cell = game.cell(floor(x/3), floor(y/3))
+                if(game.owner(cell)):
+                    continue
+            player = game.turn+1
+            line = game.play(cell)
+            paintTTT(game.boards)
+            grid.stripShow()
+            if((yield from checkWin(line, player))):
+                break
+            if(not game.free()):
+                yield .6
+                plrWins[0] += 1
+                yield from showScore(plrWins[0], colors["white"], 1)
+                break
+
+
+def tictactoeAI():
+    """tic-tac-toe against a perfect player, you are red"""
+    global tttAI
+    if(tttAI is None):
+        tttAI = tttEngine.Engine()
+    yield from tictactoe(tttAI)
+
+
+def stream():
+    """Shows frames sent over UDP by a DDP sender, going back to the mode
+    before once nothing arrives for udpStream.IDLE seconds"""
+    receiver = udpStream.DdpReceiver()
+    lastFrame = clock.now()
+    try:
+        while(True):
+            yield 1/100  # polling faster than frames arrive keeps latency low
+            frame = receiver.poll()
+            now = clock.now()
+            if(frame is None):
+                if(now-lastFrame > udpStream.IDLE):
+                    return True
+                continue
+            lastFrame = now
+            if(len(frame) == WIDTH*HEIGHT):
+                grid.drawFrame(frame)
+            else:
+                grid.drawCanvas(frame)
+    finally:
+        receiver.close()
 
 
 def ysLogo():
     grid.drawPixel(0, 1, colors["orange"])
     grid.stripShow()
 
-    while(True):
-        exit = grid.readKeys()[0]
+    while(True):  # until the mode button
+        yield 1/40
+
 
-        for x, y in exit:
-            if x == 0 and y == 0:
-                return
+modes = [pressCol, wave, simon, tictactoe, tictactoeAI, rainbow, heatMap, life, stream]
+
+
+def modeSwitch():
+    """wipes the overlay to grey between modes and blanks the board under it,
+    mainLoop then fades the grey out over the next mode"""
+    yield from transition(0x888888, surface=grid.overlay)
+    grid.setCol()
+    yield .25
 
 
 def mainLoop():
     """dispatches control to different operating modes, resetting the grid in between"""
     mode = 0
-    modes = [pressCol, wave, simon, tictactoe, rainbow, heatMap]
+    skip = None  # mode that gave up to go back, the next press passes over it
+    runtime = modeRuntime.Runtime(grid)
 
     while(True):
         # print("Entering mode {}".format(mode))
-        modes[mode]()
-        # print("exit mode {}".format(mode))
-        mode = (mode+1) % len(modes)
-        transition(col=0x888888)
-        transition(0)
-        grid.setCol()
-        time.sleep(.25)
+        stats.setMode(modes[mode].__name__)
+        try:
+            back = runtime.run(modes[mode]())
+            # print("exit mode {}".format(mode))
+            # a mode returns True to go back to the one before, e.g. stream once
+            # idle, so that mode runs again and the next press skips the idle one
+            nextMode = (mode-1 if back else mode+1) % len(modes)
+            if(nextMode == skip):
+                nextMode = (nextMode+1) % len(modes)
+            skip = mode if back else None
+            mode = nextMode
+            stats.setMode("transition")
+            animCache.trim()  # frees cached animations of modes not running if memory is short
+            runtime.run(modeSwitch())
+            runtime.spawn(fadeOverlay())
+        except frameSched.Shutdown:
+            return
 
 
 if __name__ == '__main__':
-    # init either board or tkinter
+    # init whichever backend backends.selected() picks
     print('Starting LED Board')
     print('Press Ctrl-C to quit.')
     print("Ready")
     try:
-        grid.startup()
+        backends.startup()
+        recorder.start(backend)
+        backend.setCol()
+        print(backends.startupReport(time.monotonic()))
+        stats.start()
         mainLoopThread = threading.Thread(
             name="funcLoop", target=mainLoop, daemon=True)
         mainLoopThread.start()
-        grid.block()
+        backend.block(mainLoopThread)
     except:
-        grid.setCol()
+        backend.setCol()
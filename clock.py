@@ -0,0 +1,58 @@
+"""The time and randomness modes run on. Modes, the mode runtime and font read
+the time through now() and draw random numbers from rng, never from time or
+random directly, so a test can swap in a VirtualClock and a seed:
+
+    clock.use(clock.VirtualClock())
+    clock.rng.seed(1)
+
+A virtual clock jumps straight to the next deadline instead of sleeping, so a
+simulated hour of a mode takes as long as its frames take to compute, and a
+seed reproduces the same run exactly."""
+import random
+import time
+
+import frameSched
+
+
+class MonotonicClock:
+    """The wall clock, for the real board"""
+
+    def now(self):
+        return time.monotonic()
+
+    def sleep(self, t):
+        frameSched.sleep(t)
+
+
+class VirtualClock:
+    """Simulated seconds that only pass when something sleeps"""
+
+    def __init__(self, start=0.0):
+        self.t = start
+
+    def now(self):
+        return self.t
+
+    def sleep(self, t):
+        if(frameSched.stopEvent.is_set()):
+            raise frameSched.Shutdown()
+        self.t += max(t, 0)
+
+
+current = MonotonicClock()
+rng = random.Random()  # seed it to make a run repeatable
+
+
+def use(clock):
+    """Makes <clock> the clock every mode runs on"""
+    global current
+    current = clock
+
+
+def now():
+    return current.now()
+
+
+def sleep(t):
+    """Waits <t> seconds on the current clock, raising frameSched.Shutdown on stop"""
+    current.sleep(t)
@@ -0,0 +1,74 @@
+from array import array
+
+import backends
+import colorTables
+
+GAMMA = 2.2  # the LEDs' response, per channel
+MA_PER_STEP = 20/255  # estimated current of one channel per step of its value
+MA_IDLE = 1  # current of a dark LED
+MAX_CURRENT = 10000  # mA the power supply can give the strip
+
+
+class ColorPipeline:
+    """Turns a frame of linear colors into what the LEDs are sent, in one pass:
+    per channel gamma and the global brightness are folded into one table per
+    channel, then the frame's estimated current is summed straight from the
+    output bytes. Over the power budget the pass is redone at the brightness
+    that fits, so the limiter costs nothing until it kicks in."""
+
+    def __init__(self, brightness=1, gamma=GAMMA, maxCurrent=MAX_CURRENT, size=384):
+        """<gamma> is one exponent or a (red, green, blue) triple, <maxCurrent>
+        the supply's budget in mA for the <size> LEDs, None for no limit"""
+        self.gamma = gamma if isinstance(gamma, tuple) else (gamma,)*3
+        self.brightness = brightness
+        self.maxCurrent = maxCurrent
+        self.size = size
+        self.out = array('I', bytes(4*size))
+        self.bytes = memoryview(self.out).cast('B')
+        self.tables = {}  # brightness level 0-255 -> (red, green, blue) tables
+        self.limited = 0  # frames the limiter dimmed
+
+    def level(self):
+        return max(0, min(255, round(self.brightness*255)))
+
+    def channelTables(self, level):
+        """Tables of every 0-255 channel value gamma corrected and scaled to
+        <level>/255, already shifted into place"""
+        if(level not in self.tables):
+            self.tables[level] = tuple(
+                array('I', [round(255*(v/255)**g*level/255) << shift for v in range(256)])
+                for g, shift in zip(self.gamma, (16, 8, 0)))
+        return self.tables[level]
+
+    def current(self):
+        """Estimated mA the last processed frame draws"""
+        return sum(self.bytes)*MA_PER_STEP + self.size*MA_IDLE
+
+    def process(self, frame):
+        """Returns the corrected colors of <frame>, an array reused every call"""
+        level = self.level()
+        self.fill(frame, level)
+        if(self.maxCurrent is not None and level):
+            current = self.current()
+            if(current > self.maxCurrent):
+                # the current above idle scales with the level
+                spare = self.maxCurrent - self.size*MA_IDLE
+                self.fill(frame, max(0, int(level*spare/(current-self.size*MA_IDLE))))
+                self.limited += 1
+        return self.out
+
+    def fill(self, frame, level):
+        self.out[:] = colorTables.mapChannels(frame, self.channelTables(level))
+
+
+def fromConfig(size=384, share=1):
+    """A pipeline set up from the 'brightness' (0-1), 'gamma' and 'max_current'
+    (mA, or none) lines of the config file. Its LEDs get <share> of the budget,
+    for outputs that each drive part of one supply's LEDs."""
+    config = backends.readConfig()
+    maxCurrent = config.get("max_current", str(MAX_CURRENT))
+    return ColorPipeline(
+        brightness=float(config.get("brightness", 1)),
+        gamma=float(config.get("gamma", GAMMA)),
+        maxCurrent=None if maxCurrent.lower() == "none" else float(maxCurrent)*share,
+        size=size)
@@ -0,0 +1,124 @@
+import sys
+from array import array
+from functools import lru_cache
+
+# byte of each channel inside a color in an array('I'), for strided byte copies
+redByte, greenByte, blueByte = (2, 1, 0) if sys.byteorder == "little" else (1, 2, 3)
+
+
+def rgbColor(r, g, b):
+    return (r << 16)+(g << 8)+b
+
+
+def sumColors(a, b):
+    """sums two colors togeather, adding R, G, and B seperatly, saturating at 255.
+    Adds all three channels in one go by keeping carries inside each byte."""
+    s = ((a & 0x7F7F7F)+(b & 0x7F7F7F)) ^ ((a ^ b) & 0x808080)
+    carry = ((a & b) | ((a | b) & ~s)) & 0x808080
+    return s | ((carry >> 7)*0xFF)
+
+
+def blend(dst, src, a):
+    """Mixes color <src> over <dst> with alpha <a> 0-255, red and blue in one multiply"""
+    ia = 255-a
+    rb = (((src & 0xFF00FF)*a + (dst & 0xFF00FF)*ia) >> 8) & 0xFF00FF
+    g = (((src & 0x00FF00)*a + (dst & 0x00FF00)*ia) >> 8) & 0x00FF00
+    return rb | g
+
+
+def heatCol(amt):
+    """converts 0-255 'heat' value to a RGB value"""
+    red = int(min(amt*1.5, 255))
+    green = max(2*amt-300, 0)
+    blue = int(max(255-2*amt, 0)+green)
+    return (red << 16)+(green << 8)+blue
+
+
+def wheel(pos):
+    """Generate rainbow colors across 0-255 positions."""
+    if pos < 85:
+        return rgbColor(pos * 3, 255 - pos * 3, 0)
+    elif pos < 170:
+        pos -= 85
+        return rgbColor(255 - pos * 3, 0, pos * 3)
+    else:
+        pos -= 170
+        return rgbColor(0, pos * 3, 255 - pos * 3)
+
+
+colors = {
+    "red": rgbColor(255, 0, 0),
+    "green": rgbColor(0, 255, 0),
+    "blue": rgbColor(0, 0, 255),
+    "white": rgbColor(255, 255, 255),
+    "orange": rgbColor(240, 131, 29),
+    "off": 0
+}
+
+# 256 entry tables, index with a 0-255 position/heat instead of calling the functions
+wheelLut = array('I', [wheel(i) for i in range(256)])
+heatLut = array('I', [heatCol(i) for i in range(256)])
+
+
+@lru_cache(maxsize=64)
+def shadeLut(col):
+    """256 entry table of <col> at every brightness, index with a 0-255 level
+    instead of scaling each channel. Shared between callers, don't modify it."""
+    r, g, b = col >> 16 & 0xFF, col >> 8 & 0xFF, col & 0xFF
+    return array('I', [rgbColor(r*v//255, g*v//255, b*v//255) for v in range(256)])
+
+
+# Whole frames at once: an array of n colors read as one big int has color i in
+# bits 32*i up, so the single color tricks above work on every pixel in a few
+# C level operations, with masks repeated for every color of the frame.
+
+_frameMasks = {}  # frame length -> (low 7 bits, top bit, red and blue, green) masks
+
+
+def _masks(n):
+    if(n not in _frameMasks):
+        ones = int.from_bytes(b"\x01\0\0\0"*n, "little")
+        _frameMasks[n] = (0x7F7F7F*ones, 0x808080*ones, 0xFF00FF*ones, 0x00FF00*ones)
+    return _frameMasks[n]
+
+
+def _wide(frame):
+    return int.from_bytes(frame if isinstance(frame, array) else array('I', frame), sys.byteorder)
+
+
+def _frame(wide, n):
+    out = array('I')
+    out.frombytes(wide.to_bytes(4*n, sys.byteorder))
+    return out
+
+
+def sumFrames(frames, n):
+    """sums <frames> of <n> colors pixel by pixel, each channel saturating at
+    255, like sumColors on every pixel at once. Black without any frames."""
+    low, top, __, __ = _masks(n)
+    total = 0
+    for frame in frames:
+        x = _wide(frame)
+        s = ((total & low)+(x & low)) ^ ((total ^ x) & top)
+        carry = ((total & x) | ((total | x) & ~s)) & top
+        total = s | ((carry >> 7)*0xFF)
+    return _frame(total, n)
+
+
+def blendFrames(dst, src, a):
+    """Mixes every color of <src> over <dst> with the same alpha <a> 0-255, like
+    blend on every pixel at once: both frames are scaled and summed in one go"""
+    n = len(dst)
+    __, __, rbMask, gMask = _masks(n)
+    x, y = _wide(dst), _wide(src)
+    ia = 255-a
+    rb = (((y & rbMask)*a + (x & rbMask)*ia) >> 8) & rbMask
+    g = (((y & gMask)*a + (x & gMask)*ia) >> 8) & gMask
+    return _frame(rb | g, n)
+
+
+def mapChannels(frame, tables):
+    """Returns the colors of <frame> with each channel looked up in its table of
+    <tables>, (red, green, blue) arrays of 256 values already shifted into place"""
+    rT, gT, bT = tables
+    return array('I', [rT[c >> 16 & 0xFF] | gT[c >> 8 & 0xFF] | bT[c & 0xFF] for c in frame])
@@ -0,0 +1,185 @@
+from array import array
+
+import colorTables
+import frameBuffer
+
+WIDTH = frameBuffer.WIDTH
+HEIGHT = frameBuffer.HEIGHT
+
+
+class Layer:
+    """A full frame of colors with a per pixel alpha, 0 transparent to 255 opaque.
+    Keeps the set of pixels that aren't transparent, so blending it only costs
+    the pixels it actually covers. An <opaque> layer is always fully covering
+    and keeps no alpha, the bottom one is never blended over anything."""
+
+    def __init__(self, comp, name, opaque=False):
+        self.comp = comp
+        self.name = name
+        self.opaque = opaque
+        self.colors = array('I', bytes(4*WIDTH*HEIGHT))
+        self.alpha = bytearray(WIDTH*HEIGHT)
+        self.lit = set()  # indices with alpha > 0
+        self.opacity = 255  # scales the whole layer, for fades
+
+    def drawPixel(self, x, y, c, a=255):
+        i = y*WIDTH+x
+        self.colors[i] = c
+        self.comp.dirty = True
+        if(self.opaque):
+            return
+        self.alpha[i] = a
+        if(a):
+            self.lit.add(i)
+        else:
+            self.lit.discard(i)
+
+    def load(self, frame, a=255):
+        """Copies a flat sequence of WIDTH*HEIGHT colors (index y*WIDTH+x) into the
+        layer, at alpha <a>, or with per pixel alphas if <a> is a sequence as long"""
+        self.colors[:] = frame if isinstance(frame, array) else array('I', frame)
+        if(isinstance(a, int)):
+            self.fillAlpha(a)
+        else:
+            self.alpha[:] = bytes(a)
+            self.lit = {i for i, v in enumerate(self.alpha) if v}
+            self.comp.dirty = True
+
+    def fill(self, c=0, a=255):
+        self.colors[:] = array('I', [c])*(WIDTH*HEIGHT)
+        self.fillAlpha(a)
+
+    def fillAlpha(self, a):
+        self.comp.dirty = True
+        if(self.opaque):
+            return
+        self.alpha[:] = bytes([a])*(WIDTH*HEIGHT)
+        self.lit = set(range(WIDTH*HEIGHT)) if a else set()
+
+    def clear(self):
+        """Makes the whole layer transparent"""
+        self.fillAlpha(0)
+
+    def setOpacity(self, opacity):
+        self.opacity = opacity
+        self.comp.dirty = True
+
+
+class Compositor:
+    """Stacks the mode's own frame (background) under a game state layer and a
+    text/overlay layer, blending them into the backend's frame only when one of
+    them changed. It has the backend's drawing functions, which draw the
+    background, so modes can use it as their grid. A full resolution canvas
+    replaces the background until the background is drawn again."""
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.dirty = False
+        self.ledsDrawn = False  # setLED drew on the backend since the last show
+        self.canvas = None  # the canvas under the layers, kept not copied
+        self.background = Layer(self, "background", opaque=True)
+        self.game = Layer(self, "game")
+        self.overlay = Layer(self, "overlay")
+        self.layers = [self.background, self.game, self.overlay]
+        # pixelLeds[i] are the backend's LEDs of logical pixel i
+        self.pixelLeds = [[] for _ in range(WIDTH*HEIGHT)]
+        for led, i in enumerate(grid.fb.ledMap):
+            self.pixelLeds[i].append(led)
+
+    def compose(self):
+        """Returns the blended frame, the background itself when nothing covers it.
+        A layer covering every pixel at one alpha, like a fading wipe, is blended
+        over the whole frame at once."""
+        frame = self.background.colors
+        for layer in self.layers[1:]:
+            if(not layer.lit or not layer.opacity):
+                continue
+            colors, alpha, opacity = layer.colors, layer.alpha, layer.opacity
+            if(len(layer.lit) == len(alpha) and alpha.count(alpha[0]) == len(alpha)):
+                a = alpha[0]*opacity//255
+                frame = colors[:] if a == 255 else colorTables.blendFrames(frame, colors, a)
+                continue
+            if(frame is self.background.colors):
+                frame = frame[:]
+            for i in layer.lit:
+                a = alpha[i]*opacity//255
+                frame[i] = colors[i] if a == 255 else colorTables.blend(frame[i], colors[i], a)
+        return frame
+
+    def stripShow(self):
+        """Shows the blended layers if one changed, or else the LEDs setLED drew.
+        Drawing a layer after setLED replaces the LEDs, like on the backends."""
+        if(self.dirty):
+            self.dirty = False
+            self.ledsDrawn = False
+            if(self.canvas is not None):
+                self.showCanvas()
+            else:
+                self.grid.drawFrame(self.compose())
+        elif(self.ledsDrawn):
+            self.ledsDrawn = False
+            self.grid.stripShow()
+
+    def showCanvas(self):
+        """Shows the canvas with the layers above the background blended over
+        the LEDs of each pixel they cover"""
+        covering = [layer for layer in self.layers[1:] if layer.lit and layer.opacity]
+        if(not covering):
+            self.grid.drawCanvas(self.canvas)
+            return
+        fb = self.grid.fb
+        fb.loadCanvas(self.canvas)
+        leds = fb.leds
+        for layer in covering:
+            colors, alpha, opacity = layer.colors, layer.alpha, layer.opacity
+            for i in layer.lit:
+                a = alpha[i]*opacity//255
+                c = colors[i]
+                for n in self.pixelLeds[i]:
+                    leds[n] = c if a == 255 else colorTables.blend(leds[n], c, a)
+        self.grid.stripShow()
+
+    # drawing the background, with the same signatures as the backends
+
+    def drawPixel(self, x, y, c):
+        self.canvas = None
+        self.background.drawPixel(x, y, c)
+
+    def drawFrame(self, frame):
+        self.canvas = None
+        self.background.load(frame)
+        self.stripShow()
+
+    def drawGrid(self, grid):
+        self.drawFrame([val for row in grid for val in row])
+
+    def setCol(self, c=0, n=None):
+        self.canvas = None
+        if(n is None):
+            self.background.fill(c)
+        else:
+            for i in n:
+                self.background.drawPixel(i % WIDTH, i//WIDTH, c)
+        self.stripShow()
+
+    # full resolution drawing and input go straight to the backend
+
+    def setLED(self, n, c):
+        """Sets one LED on the backend, over the blended layers as they are now"""
+        self.canvas = None
+        if(self.dirty):
+            self.dirty = False
+            self.grid.fb.load(self.compose())  # the backend expands it on its setLED
+        self.grid.setLED(n, c)
+        self.ledsDrawn = True
+
+    def drawCanvas(self, canvas):
+        """Shows a flat sequence of colors for every LED (index line*LED_COLS+col)
+        under the game and overlay layers"""
+        self.canvas = canvas
+        self.dirty = False
+        self.ledsDrawn = False
+        self.showCanvas()
+
+    def readKeys(self):
+        return self.grid.readKeys()
@@ -1,79 +1,140 @@
-import time
-import boardV2 as main
-
-if(main.realBoard):
-    import realGrid as grid
-else:
-    import tKinterGrid as grid
-
-
-letters = [[]for __ in range(27)]
-letters[3] = [(3, 2), (3, 1), (4, 0), (5, 0), (6, 0), (7, 2), (7, 1)]  # C
-letters[8] = [(3, 2), (3, 0), (4, 2), (4, 0), (5, 2), (5, 1),
-              (5, 0), (6, 2), (6, 0), (7, 2), (7, 0)]  # H
-letters[19] = [(3, 2), (3, 1), (3, 0), (4, 2), (5, 2), (5, 1),
-               (5, 0), (6, 0), (7, 2), (7, 1), (7, 0)]  # S
-digits = [[(3, 2), (3, 1), (3, 0), (4, 2), (4, 0), (5, 2), (5, 0), (6, 2), (6, 0), (7, 2), (7, 1), (7, 0)],
-          [(3, 2), (3, 1), (3, 0), (4, 1), (5, 1), (6, 1), (6, 0), (7, 1)],
-          [(3, 2), (3, 1), (3, 0), (4, 0), (5, 1), (6, 2), (7, 2), (7, 1), (7, 0)],
-          [(3, 2), (3, 1), (3, 0), (4, 2), (5, 2),
-           (5, 1), (6, 2), (7, 2), (7, 1), (7, 0)],
-          [(3, 2), (4, 2), (5, 2), (5, 1), (5, 0), (6, 2), (6, 0), (7, 2), (7, 0)],
-          [(3, 2), (3, 1), (3, 0), (4, 2), (5, 2), (5, 1),
-           (5, 0), (6, 0), (7, 2), (7, 1), (7, 0)],
-          [(3, 2), (3, 1), (3, 0), (4, 2), (4, 0), (5, 2),
-           (5, 1), (5, 0), (6, 0), (7, 2), (7, 1), (7, 0)],
-          [(3, 1), (4, 1), (5, 1), (6, 2), (7, 2), (7, 1), (7, 0)],
-          [(3, 2), (3, 1), (3, 0), (4, 2), (4, 0), (5, 2), (5, 1),
-           (5, 0), (6, 2), (6, 0), (7, 2), (7, 1), (7, 0)],
-          [(3, 2), (3, 1), (3, 0), (4, 2), (5, 2), (5, 1),
-           (5, 0), (6, 2), (6, 0), (7, 2), (7, 1), (7, 0)]
-          ]
-
-
-def rotDigits():
-    for i, digit in enumerate(letters):
-        for j, coord in enumerate(digit):
-            x, y = coord
-            letters[i][j] = (7-y, x)
-    print(letters)
-
-
-def drawNum(num, col):
-    """prints a 2 digit number to the screen in the specified color. Numbers are clamped to 0-99"""
-    if(num > 99):
-        num = 99
-    elif(num < 0):
-        num = 0
-    for x, y in digits[int(num/10)]:
-        grid.drawPixel(x-1, y+1, col)
-    for x, y in digits[num % 10]:
-        grid.drawPixel(x-1, y+5, col)
-
-
-def drawString(str, col):
-    """Draws a 1-2 char string to the grid."""
-    if(len(str) > 2):
-        return
-    if(len(str) == 1):
-        str = " " + str
-    str = str.upper()
-    for x, y in letters[ord(str[0])-0x40]:
-        grid.drawPixel(x-1, y+1, col)
-    for x, y in letters[ord(str[1])-0x40]:
-        grid.drawPixel(x-1, y+5, col)
+from array import array
+from functools import lru_cache
+
+import backends
+import frameBuffer
+from colorTables import colors
+
+grid = backends.load()
+
+
+# 3x5 glyphs, 5 rows of 3 dots from the top, lowercase is drawn as uppercase
+GLYPHS = {
+    " ": ".../.../.../.../...", "!": ".#./.#./.#./.../.#.", '"': "#.#/#.#/.../.../...",
+    "#": "#.#/###/#.#/###/#.#", "$": ".##/##./.#./.##/##.", "%": "#.#/..#/.#./#../#.#",
+    "&": ".#./#.#/.#./#.#/.##", "'": ".#./.#./.../.../...", "(": "..#/.#./.#./.#./..#",
+    ")": "#../.#./.#./.#./#..", "*": "#.#/.#./#.#/.../...", "+": ".../.#./###/.#./...",
+    ",": ".../.../.../.#./#..", "-": ".../.../###/.../...", ".": ".../.../.../.../.#.",
+    "/": "..#/..#/.#./#../#..", "0": "###/#.#/#.#/#.#/###", "1": ".#./##./.#./.#./###",
+    "2": "###/..#/.#./#../###", "3": "###/..#/.##/..#/###", "4": "#.#/#.#/###/..#/..#",
+    "5": "###/#../###/..#/###", "6": "###/#../###/#.#/###", "7": "###/..#/.#./.#./.#.",
+    "8": "###/#.#/###/#.#/###", "9": "###/#.#/###/..#/###", ":": ".../.#./.../.#./...",
+    ";": ".../.#./.../.#./#..", "<": "..#/.#./#../.#./..#", "=": ".../###/.../###/...",
+    ">": "#../.#./..#/.#./#..", "?": "###/..#/.#./.../.#.", "@": ".#./#.#/###/#../.##",
+    "A": ".#./#.#/###/#.#/#.#", "B": "##./#.#/##./#.#/##.", "C": ".##/#../#../#../.##",
+    "D": "##./#.#/#.#/#.#/##.", "E": "###/#../##./#../###", "F": "###/#../##./#../#..",
+    "G": ".##/#../#.#/#.#/.##", "H": "#.#/#.#/###/#.#/#.#", "I": "###/.#./.#./.#./###",
+    "J": "..#/..#/..#/#.#/.#.", "K": "#.#/#.#/##./#.#/#.#", "L": "#../#../#../#../###",
+    "M": "#.#/###/###/#.#/#.#", "N": "##./#.#/#.#/#.#/#.#", "O": ".#./#.#/#.#/#.#/.#.",
+    "P": "##./#.#/##./#../#..", "Q": ".#./#.#/#.#/###/.##", "R": "##./#.#/##./#.#/#.#",
+    "S": "###/#../###/..#/###", "T": "###/.#./.#./.#./.#.", "U": "#.#/#.#/#.#/#.#/###",
+    "V": "#.#/#.#/#.#/#.#/.#.", "W": "#.#/#.#/###/###/#.#", "X": "#.#/#.#/.#./#.#/#.#",
+    "Y": "#.#/#.#/.#./.#./.#.", "Z": "###/..#/.#./#../###", "[": "##./#../#../#../##.",
+    "\\": "#../#../.#./..#/..#", "]": ".##/..#/..#/..#/.##", "^": ".#./#.#/.../.../...",
+    "_": ".../.../.../.../###", "`": "#../.#./.../.../...", "{": ".##/.#./#../.#./.##",
+    "|": ".#./.#./.#./.#./.#.", "}": "##./.#./..#/.#./##.", "~": ".../..#/###/#../...",
+}
+
+
+def glyphColumns(rows):
+    """The 3 columns of a glyph, left to right, as 5 bit masks with bit 0 the top dot"""
+    rows = rows.split("/")
+    return tuple(sum(1 << r for r in range(5) if rows[r][c] == "#") for c in range(3))
+
+
+# glyph columns for every printable ASCII character
+glyphs = {chr(i): glyphColumns(GLYPHS.get(chr(i).upper(), GLYPHS["?"])) for i in range(32, 127)}
+
+# Text reads along y, the board's rows, with the top of a glyph at x=6, so one
+# column of a glyph is one WIDTH pixel row of the frame and is drawn as a slice.
+_rows = {}  # (on, off, typecode) -> the 32 possible glyph columns as frame rows
+
+
+def columnRows(on, off=0, typecode='I'):
+    """Frame rows for every 5 bit glyph column, lit dots <on>, the rest <off>"""
+    key = (on, off, typecode)
+    if(key not in _rows):
+        rows = []
+        for mask in range(32):
+            row = array(typecode, [off])*frameBuffer.WIDTH
+            for r in range(5):
+                if(mask >> r & 1):
+                    row[6-r] = on
+            rows.append(row)
+        _rows[key] = rows
+    return _rows[key]
+
+
+@lru_cache(maxsize=64)
+def textColumns(text):
+    """All columns of <text>, each character a blank column and then its glyph,
+    so two characters fill an 8 row board exactly"""
+    columns = []
+    for ch in text:
+        columns.append(0)
+        columns += glyphs.get(ch, glyphs["?"])
+    return tuple(columns)
+
+
+def render(text, on, off=0, offset=0, typecode='I'):
+    """A full frame of <text> scrolled <offset> columns along, <on> where a dot
+    is lit and <off> elsewhere. With typecode 'B' it renders alpha masks."""
+    width, height = frameBuffer.WIDTH, frameBuffer.HEIGHT
+    columns = textColumns(text)
+    rows = columnRows(on, off, typecode)
+    frame = array(typecode, bytes(array(typecode).itemsize*width*height))
+    for y in range(height):
+        i = offset+y
+        frame[y*width:y*width+width] = rows[columns[i] if 0 <= i < len(columns) else 0]
+    return frame
+
+
+def textWidth(text):
+    return len(textColumns(text))
+
+
+def blit(text, col, layer=None, offset=0, dim=0):
+    """Draws the rows of <text> from column <offset> on compositor <layer>, the
+    dots opaque and the rest of the layer at alpha <dim>. Without a layer the
+    whole grid is redrawn with the text on black."""
+    frame = render(text, col, 0, offset)
+    if(layer is None):
+        grid.drawFrame(frame)
+    else:
+        layer.load(frame, render(text, 255, dim, offset, 'B'))
+
+
+def drawNum(num, col, layer=None, dim=0):
+    """prints a 2 digit number to the screen in the specified color. Numbers are clamped to 0-99,
+    scrollText shows longer ones. Draws on <layer> like blit()"""
+    num = min(max(num, 0), 99)
+    blit("{:02d}".format(num), col, layer, dim=dim)
+
+
+def drawString(str, col, layer=None, dim=0):
+    """Draws the first 2 chars of a string to the grid, scrollText shows the whole thing."""
+    blit(str if len(str) > 1 else " " + str, col, layer, dim=dim)
+
+
+def scrollText(text, col, layer=None, hold=1, interval=1/12, dim=0):
+    """Scrolls <text> through the grid one column per <interval>, pausing <hold>
+    at the start and end, or just shows it for <hold> if it fits. A generator
+    for modeRuntime, draws like blit()"""
+    last = max(textWidth(text)-frameBuffer.HEIGHT, 0)
+    for offset in range(last+1):
+        blit(text, col, layer, offset, dim)
+        if(layer is not None):
+            layer.comp.stripShow()
+        yield hold if offset in (0, last) else interval
 
 
 def fontInput():
-    """used to input new characters, enter them in top 5x3, (1,1) clears (one up and over from bottom left)"""
-    drawInterval = 1/40
+    """used to input new characters, enter them in top 5x3, (1,1) clears (one up and over from bottom left).
+    A mode generator, run it with modeRuntime.run(fontInput())"""
     # 8x8 grid, color index for each pixel
     pixelGrid = [[0 for x in range(8)] for y in range(8)]
     while(True):
-        nextDrawTime = time.time()+drawInterval
-        kDownEvents = grid.readKeys()[0]
-        if(main.modeBtn in kDownEvents):
-            return
+        kDownEvents, __ = yield 1/40
         if((1, 1) in kDownEvents):
             k = []
             for y, row in enumerate(pixelGrid):
@@ -86,30 +147,20 @@ def fontInput():
             # 8x8 grid, color index for each pixel
             pixelGrid = [[0 for x in range(8)] for y in range(8)]
         for x, y in kDownEvents:
-            colInd = main.colors.index(pixelGrid[y][x])  # get current col ind
+            colInd = colors.index(pixelGrid[y][x])  # get current col ind
             colInd = (colInd + 1) % 2  # increment color ind
             # set new color
-            pixelGrid[y][x] = main.colors["red"] if colInd == 0 else 0
+            pixelGrid[y][x] = colors["red"] if colInd == 0 else 0
         grid.drawGrid(pixelGrid)
-        while(time.time() < nextDrawTime):
-            pass
 
 
 def testDigits():
-    """testing for digits, increments on click"""
-    drawString("hs", main.colors["red"])
-    grid.stripShow()
-    time.sleep(2)
-    rotDigits()
+    """testing for digits, increments on click. A mode generator like fontInput"""
+    yield from scrollText("hello 0123456789", colors["red"])
     i = 0
-    grid.setCol()
     while(True):
-        drawNum(i, main.colors["red"])
-        grid.stripShow()
+        drawNum(i, colors["red"])
         keys = []
         while(not keys):
-            keys = grid.readKeys()[0]
-        if(main.modeBtn in keys):
-            return
+            keys, __ = yield 1/40
         i = (i + 1)
-        grid.setCol()
@@ -0,0 +1,81 @@
+from array import array
+from operator import itemgetter
+
+import geometry
+
+# the configured board, see geometry
+WIDTH = geometry.board.width
+HEIGHT = geometry.board.height
+LED_COUNT = geometry.board.count
+LED_COLS = geometry.board.cols  # LEDs along each strip run, 3 per logical pixel
+LED_LINES = geometry.board.lines  # strip runs up the board, 2 per logical row
+
+
+class FrameBuffer:
+    """Holds the logical frame as a flat array (index y*width+x) and the LEDs of
+    every panel in strip order. The logical frame is expanded to the LEDs in a
+    single pass when a frame is taken, unless the mode is drawing LEDs directly."""
+
+    def __init__(self, geom=None):
+        geom = geom or geometry.board
+        self.width = geom.width
+        self.height = geom.height
+        self.pixels = array('I', bytes(4*geom.width*geom.height))
+        self.leds = array('I', bytes(4*geom.count))
+        self.hiRes = False  # leds were drawn directly since the last logical draw
+        # ledMap[led] is the logical pixel that led belongs to
+        self.ledMap = tuple(geom.ledMap())
+        # canvasMap[led] is the canvas index (line*cols+col) of that led
+        self.canvasMap = tuple(geom.canvasMap())
+        # itemgetter does the whole gather in C, no per-LED python calls
+        self._gather = itemgetter(*self.ledMap)
+        self._gatherCanvas = itemgetter(*self.canvasMap)
+
+    def drawPixel(self, x, y, c):
+        self.pixels[y*self.width+x] = c
+        self.hiRes = False
+
+    def load(self, frame):
+        """Copies a flat sequence of width*height colors (index y*width+x) into the buffer"""
+        self.pixels[:] = frame if isinstance(frame, array) else array('I', frame)
+        self.hiRes = False
+
+    def loadGrid(self, grid):
+        """Copies a nested [y][x] list of colors into the buffer"""
+        for y, row in enumerate(grid):
+            self.pixels[y*self.width:(y+1)*self.width] = array('I', row)
+        self.hiRes = False
+
+    def fill(self, c=0, n=None):
+        """Sets every pixel, or only the logical indices in <n>, to <c>"""
+        if(n is None):
+            self.pixels[:] = array('I', [c])*len(self.pixels)
+        else:
+            for i in n:
+                self.pixels[i] = c
+        self.hiRes = False
+
+    def setLED(self, n, c):
+        """Sets the LED at strip index <n>, drawing at full resolution"""
+        if(not self.hiRes):
+            self.ledFrame()
+            self.hiRes = True
+        self.leds[n] = c
+
+    def loadCanvas(self, canvas):
+        """Copies a flat sequence of colors for every LED, addressed by physical
+        position (index line*LED_COLS+col, line 0 at the bottom) in one pass"""
+        self.leds[:] = array('I', self._gatherCanvas(canvas))
+        self.hiRes = True
+
+    def loadLeds(self, leds):
+        """Copies colors for every LED already in strip order into the LEDs"""
+        self.leds[:] = leds if isinstance(leds, array) else array('I', leds)
+        self.hiRes = True
+
+    def ledFrame(self):
+        """Returns the colors of all LEDs in strip order. The array is reused,
+        copy it to keep it."""
+        if(not self.hiRes):
+            self.leds[:] = array('I', self._gather(self.pixels))
+        return self.leds
@@ -0,0 +1,45 @@
+import threading
+import time
+
+overruns = {}  # count of late frames for each mode or paced thread, by name
+stopEvent = threading.Event()
+
+
+class Shutdown(Exception):
+    """Raised inside a mode when the board is shutting down"""
+
+
+def stop():
+    """Asks the running mode to exit at its next sleep or frame boundary"""
+    stopEvent.set()
+
+
+def sleep(t):
+    """time.sleep that wakes up and raises Shutdown as soon as stop() is called"""
+    if(stopEvent.wait(max(t, 0))):
+        raise Shutdown()
+
+
+class FrameScheduler:
+    """Paces a background thread's loop, like key scanning, at a fixed interval,
+    sleeping on the monotonic clock instead of spinning. Call wait() once at the
+    end of every pass. Modes are paced by modeRuntime instead."""
+
+    def __init__(self, interval, name):
+        self.interval = interval
+        self.name = name
+        self.nextFrame = time.monotonic()+interval
+        overruns.setdefault(name, 0)
+
+    def wait(self):
+        """Sleeps until the current pass's deadline. Deadlines step by a fixed
+        interval from the first pass, so sleep jitter doesn't drift the rate,
+        and a pass that runs over drops to the next slot still to come"""
+        now = time.monotonic()
+        if(now >= self.nextFrame):
+            overruns[self.name] += 1
+            # stay in phase with the original slots
+            missed = int((now-self.nextFrame)/self.interval)+1
+            self.nextFrame += missed*self.interval
+        sleep(self.nextFrame-now)
+        self.nextFrame += self.interval
@@ -0,0 +1,145 @@
+"""Board geometry: the logical pixel grid and the LED panels tiling it.
+
+Every panel is wired like the original 8x8 board, each logical row is two strip
+runs of 3 LEDs per pixel, the bottom run left to right and the top one back.
+The strip order of the whole board is panel 0's LEDs, then panel 1's and so
+on. Panels on the same GPIO pin are daisy-chained in that order, the data out
+of one into the next. Set it up in ledBoard.conf, e.g. a 16x16 wall of four
+8x8 panels in two chains:
+
+    size = 16x16
+    panels = 2x2          # columns x rows of panels, from the bottom left
+    panel_pins = 18, 18, 13, 13
+
+rpi_ws281x drives both PWM channels from one device, PWM0 on pin 18 or 12 and
+PWM1 on 13 or 19, and PCM (pin 21) and SPI (pin 10) from a device each, see
+outputs(). Pins 10 and 12 are keypad lines on the stock wiring, so chains go on
+18, 13 or 19 and 21. Without panel_pins every panel is chained on pin 18.
+However big the board, the keys are the
+KEYPAD_SIZE x KEYPAD_SIZE pixels at the bottom left, over the first panel."""
+import backends
+
+LEDS_X = 3  # LEDs along a strip run per logical pixel
+LEDS_Y = 2  # strip runs per logical row
+PANEL_SIZE = 8  # logical pixels along each side of a panel
+KEYPAD_SIZE = 8  # the 8x8 key matrix covers the pixels at the bottom left
+# ws281x peripheral and channel behind each pin a panel can be on
+OUTPUT_PINS = {18: ("PWM", 0), 12: ("PWM", 0), 13: ("PWM", 1), 19: ("PWM", 1),
+               21: ("PCM", 0), 10: ("SPI", 0)}
+
+
+class Panel:
+    """One panel of <width> x <height> logical pixels with its bottom left pixel
+    at (<x>, <y>) on the board, driven from GPIO <pin>"""
+
+    def __init__(self, x=0, y=0, width=PANEL_SIZE, height=PANEL_SIZE, pin=18):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.pin = pin
+        self.cols = width*LEDS_X  # LEDs along each strip run
+        self.lines = height*LEDS_Y  # strip runs up the panel
+        self.count = self.cols*self.lines
+        self.start = 0  # strip index of the panel's first LED on the whole board
+
+    def pixelLeds(self, x, y):
+        """Returns the six panel strip indices that make up the panel's pixel (x, y)"""
+        bStart = y*2*self.cols+x*LEDS_X
+        tStart = y*2*self.cols+2*self.cols-LEDS_X-x*LEDS_X
+        return (bStart, bStart+1, bStart+2, tStart, tStart+1, tStart+2)
+
+    def canvasLed(self, col, line):
+        """Returns the panel strip index of the LED at column <col> of run <line>,
+        with column 0 on the left of every run"""
+        return line*self.cols + (col if line % 2 == 0 else self.cols-1-col)
+
+
+class Geometry:
+    """A <width> x <height> board of logical pixels, exactly tiled by <panels>"""
+
+    def __init__(self, width, height, panels):
+        self.width = width
+        self.height = height
+        self.panels = panels
+        self.cols = width*LEDS_X  # LEDs along the whole board, the canvas width
+        self.lines = height*LEDS_Y
+        covered = bytearray(width*height)
+        start = 0
+        for panel in panels:
+            panel.start = start
+            start += panel.count
+            for y in range(panel.y, panel.y+panel.height):
+                for x in range(panel.x, panel.x+panel.width):
+                    if(not (0 <= x < width and 0 <= y < height) or covered[y*width+x]):
+                        raise ValueError("panels must tile the {}x{} board exactly".format(width, height))
+                    covered[y*width+x] = 1
+        if(not all(covered)):
+            raise ValueError("panels must tile the {}x{} board exactly".format(width, height))
+        self.count = start
+
+    def ledMap(self):
+        """For every LED in board strip order, the logical pixel (y*width+x) it shows"""
+        ledMap = [0]*self.count
+        for panel in self.panels:
+            for y in range(panel.height):
+                for x in range(panel.width):
+                    for led in panel.pixelLeds(x, y):
+                        ledMap[panel.start+led] = (panel.y+y)*self.width+panel.x+x
+        return ledMap
+
+    def outputs(self):
+        """Groups the panels by the ws281x device that drives them, as a list of
+        [(channel, pin, [panel, ...]), ...] per device, each channel's panels
+        in chain order. Raises ValueError if the pins can't all be driven."""
+        devices = {}  # peripheral -> {channel: (pin, panels)}
+        for panel in self.panels:
+            if(panel.pin not in OUTPUT_PINS):
+                raise ValueError("pin {} can't drive a panel, use one of {}".format(
+                    panel.pin, ", ".join(str(p) for p in OUTPUT_PINS)))
+            kind, channel = OUTPUT_PINS[panel.pin]
+            pin, chain = devices.setdefault(kind, {}).setdefault(channel, (panel.pin, []))
+            if(pin != panel.pin):
+                raise ValueError("pins {} and {} are both {} channel {}, chain the panels on one".format(
+                    pin, panel.pin, kind, channel))
+            chain.append(panel)
+        return [[(c, device[c][0], device[c][1]) for c in sorted(device)]
+                for device in devices.values()]
+
+    def canvasMap(self):
+        """For every LED in board strip order, its canvas index (line*cols+col)"""
+        canvasMap = [0]*self.count
+        for panel in self.panels:
+            for line in range(panel.lines):
+                for col in range(panel.cols):
+                    canvasMap[panel.start+panel.canvasLed(col, line)] = (
+                        (panel.y*LEDS_Y+line)*self.cols + panel.x*LEDS_X+col)
+        return canvasMap
+
+
+def tiled(columns, rows, pins=(18,)):
+    """A board of <columns> x <rows> standard panels, numbered row by row from
+    the bottom left, panel i on pins[i]. The last pin repeats, chaining the
+    panels after it on that pin."""
+    panels = []
+    for i in range(columns*rows):
+        pin = pins[min(i, len(pins)-1)]
+        panels.append(Panel(i % columns*PANEL_SIZE, i//columns*PANEL_SIZE, pin=pin))
+    return Geometry(columns*PANEL_SIZE, rows*PANEL_SIZE, panels)
+
+
+def fromConfig(config):
+    """The geometry in the config's size, panels and panel_pins lines, one 8x8
+    panel if there are none"""
+    width, height = (int(n) for n in config.get("size", "8x8").lower().split("x"))
+    columns, rows = (int(n) for n in config.get(
+        "panels", "{}x{}".format(width//PANEL_SIZE, height//PANEL_SIZE)).lower().split("x"))
+    pins = tuple(int(p) for p in config.get("panel_pins", "18").split(","))
+    board = tiled(columns, rows, pins)
+    if((board.width, board.height) != (width, height)):
+        raise ValueError("{}x{} panels of {} don't make a {}x{} board".format(
+            columns, rows, PANEL_SIZE, width, height))
+    return board
+
+
+board = fromConfig(backends.readConfig())  # the board every module draws on
@@ -0,0 +1,61 @@
+class HeatEngine:
+    """Double buffered heat diffusion over a width x height grid. Heat is kept in
+    flat lists with a one cell border of zeros, so the four neighbour update is a
+    single pass over shifted slices of the previous buffer."""
+
+    def __init__(self, width, height, lut, trans=.15, loss=.99, add=.1):
+        """<lut> maps rounded heat 0-255 to a RGB value. <trans> is the heat
+        transfer between neighbours per step, <loss> the fraction of heat each
+        cell keeps per step and <add> the heat added per step by heat()"""
+        if(not 0 <= trans <= .25):
+            raise ValueError("trans must be between 0 and .25 to stay stable")
+        self.width = width
+        self.height = height
+        self.lut = lut
+        self.trans = trans
+        self.add = add
+        self.stride = width+2
+        size = self.stride*(height+2)
+        self.cur = [0.0]*size
+        self.next = [0.0]*size
+        # the stencil runs over every cell from the first to the last real one,
+        # border cells in between are zeroed again by their 0 loss factor
+        self.start = self.stride+1
+        self.end = size-self.stride-1
+        self.nbrCount = []
+        self.lossMask = []
+        for i in range(self.start, self.end):
+            x = i % self.stride-1
+            y = i//self.stride-1
+            if(0 <= x < width):
+                self.nbrCount.append((x > 0)+(x < width-1)+(y > 0)+(y < height-1))
+                self.lossMask.append(loss)
+            else:
+                self.nbrCount.append(0)
+                self.lossMask.append(0.0)
+
+    def heat(self, x, y):
+        """Heats up cell (x, y), approaching 1000 before clamping"""
+        i = (y+1)*self.stride+x+1
+        self.cur[i] += self.add*(1000-self.cur[i])
+
+    def step(self):
+        """Spreads heat to the four neighbours, loses some and clamps to 0-255,
+        reading only from the previous buffer"""
+        cur = self.cur
+        s, e, w, k = self.start, self.end, self.stride, self.trans
+        self.next[s:e] = [min((c+k*(l+r+u+d-n*c))*m, 255.0)
+                          for c, l, r, u, d, n, m in zip(
+                              cur[s:e], cur[s-1:e-1], cur[s+1:e+1],
+                              cur[s+w:e+w], cur[s-w:e-w],
+                              self.nbrCount, self.lossMask)]
+        self.cur, self.next = self.next, cur
+
+    def render(self):
+        """Returns the grid as a flat list of RGB values (index y*width+x)"""
+        lut = self.lut
+        frame = []
+        for y in range(1, self.height+1):
+            row = y*self.stride+1
+            frame += [lut[int(v+.5)] for v in self.cur[row:row+self.width]]
+        return frame
@@ -0,0 +1,73 @@
+import collections
+import threading
+import time
+
+import frameSched
+import stats
+
+
+class KeyScanner:
+    """Scans a key matrix on its own thread at a fixed rate, debounces every key
+    and queues timestamped (time, key, pressed) events for the mode to drain"""
+
+    def __init__(self, scan, rate=100, debounce=2, maxEvents=256):
+        """<scan> returns the keys currently down. A key has to read the same for
+        <debounce> scans in a row before it changes state. Once <maxEvents> are
+        waiting the oldest are dropped."""
+        self.scan = scan
+        self.interval = 1/rate
+        self.debounce = debounce
+        # deque appends and pops are atomic, so the scan thread never waits on a reader
+        self.events = collections.deque(maxlen=maxEvents)
+        self.held = frozenset()  # debounced keys that are down
+        self.pending = {}  # key -> [scans read in the other state, time first read]
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(name="keyScan", target=self.run, daemon=True)
+        self.thread.start()
+
+    def join(self, timeout=None):
+        if(self.thread is not None):
+            self.thread.join(timeout)
+
+    def run(self):
+        sched = frameSched.FrameScheduler(self.interval, "keyScan")
+        try:
+            while(True):
+                self.poll()
+                sched.wait()
+        except frameSched.Shutdown:
+            return
+
+    def poll(self):
+        """Scans once, queuing events for keys that have settled into a new state"""
+        now = time.monotonic()
+        down = set(self.scan())
+        stats.record("scan", time.monotonic()-now)
+        changed = down ^ self.held
+        for key in list(self.pending):
+            if(key not in changed):  # bounced back before settling
+                del self.pending[key]
+        if(not changed):
+            return
+        held = set(self.held)
+        for key in changed:
+            count = self.pending.setdefault(key, [0, now])
+            count[0] += 1
+            if(count[0] >= self.debounce):
+                del self.pending[key]
+                pressed = key in down
+                if(pressed):
+                    held.add(key)
+                else:
+                    held.discard(key)
+                self.events.append((count[1], key, pressed))
+        self.held = frozenset(held)
+
+    def drain(self):
+        """Returns and removes all queued events, oldest first"""
+        events = []
+        while(self.events):
+            events.append(self.events.popleft())
+        return events
@@ -0,0 +1,60 @@
+"""ws281x output through rpi_ws281x's low level ws module. Adafruit_NeoPixel's
+slice assignment calls ws2811_led_set once per LED from a python loop, here a
+frame is copied into the driver's LED buffers with a memmove per channel. One
+LedStrip is one ws2811_t device, which can drive both PWM channels at once."""
+import ctypes
+
+
+class LedStrip:
+    """A ws281x device sending with DMA channel <dma> on one or both of its
+    <channels>, given as (channel, pin, count) in the order their LEDs come in
+    the frames passed to show(). rpi_ws281x is only imported here, on the Pi."""
+
+    def __init__(self, channels, freq=800000, dma=10, invert=False, brightness=255):
+        from rpi_ws281x import ws
+        self.ws = ws
+        self.device = ws.new_ws2811_t()
+        for n in range(2):  # both channels start unused
+            chan = ws.ws2811_channel_get(self.device, n)
+            ws.ws2811_channel_t_count_set(chan, 0)
+            ws.ws2811_channel_t_gpionum_set(chan, 0)
+            ws.ws2811_channel_t_invert_set(chan, 0)
+            ws.ws2811_channel_t_brightness_set(chan, 0)
+        self.channels = []  # [channel struct, LED count], in frame order
+        for channel, pin, count in channels:
+            chan = ws.ws2811_channel_get(self.device, channel)
+            ws.ws2811_channel_t_count_set(chan, count)
+            ws.ws2811_channel_t_gpionum_set(chan, pin)
+            ws.ws2811_channel_t_invert_set(chan, 1 if invert else 0)
+            ws.ws2811_channel_t_brightness_set(chan, brightness)
+            ws.ws2811_channel_t_strip_type_set(chan, ws.WS2811_STRIP_GRB)
+            self.channels.append((chan, count))
+        ws.ws2811_t_freq_set(self.device, freq)
+        ws.ws2811_t_dmanum_set(self.device, dma)
+        self.buffers = []  # (address of the driver's LED array, count), from begin()
+
+    def check(self, resp, call):
+        if(resp != 0):
+            raise RuntimeError("{} failed with code {} ({})".format(
+                call, resp, self.ws.ws2811_get_return_t_str(resp)))
+
+    def begin(self):
+        self.check(self.ws.ws2811_init(self.device), "ws2811_init")
+        self.buffers = [(int(self.ws.ws2811_channel_t_leds_get(chan)), count)
+                        for chan, count in self.channels]
+
+    def show(self, leds):
+        """Copies <leds>, an array('I') of colors with each channel's LEDs in
+        strip order, into the driver's buffers and sends them, blocking until
+        they're out"""
+        address = leds.buffer_info()[0]
+        for buffer, count in self.buffers:
+            ctypes.memmove(buffer, address, 4*count)
+            address += 4*count
+        self.check(self.ws.ws2811_render(self.device), "ws2811_render")
+
+    def close(self):
+        if(self.device is not None):
+            self.ws.ws2811_fini(self.device)
+            self.ws.delete_ws2811_t(self.device)
+            self.device = None
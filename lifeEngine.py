@@ -0,0 +1,112 @@
+from array import array
+
+# rule presets in B/S notation, the neighbour counts that give birth to a dead
+# cell and the counts that let a live one survive
+RULES = {
+    "life": "B3/S23",
+    "highlife": "B36/S23",
+    "day & night": "B3678/S34678",
+    "maze": "B3/S12345",
+    "seeds": "B2/S",
+}
+
+
+def parseRule(rule):
+    """Returns the (births, survivals) neighbour counts of a rule like "B3/S23",
+    or of a preset name in RULES"""
+    rule = RULES.get(rule, rule)
+    try:
+        b, s = rule.upper().split("/")
+        if(b[0] != "B" or s[0] != "S"):
+            raise ValueError
+        births = tuple(sorted({int(n) for n in b[1:]}))
+        survivals = tuple(sorted({int(n) for n in s[1:]}))
+    except (ValueError, IndexError):
+        raise ValueError("{!r} is not a rule like B3/S23".format(rule)) from None
+    if(any(n > 8 for n in births+survivals)):
+        raise ValueError("{!r} counts more than 8 neighbours".format(rule))
+    return (births, survivals)
+
+
+class LifeEngine:
+    """Life-like cellular automata on a width x height bitboard, cells outside
+    the board are dead. The whole board is one int with cell (x, y) at bit
+    y*width+x, so a generation is a few dozen shifts and masks over the whole
+    board at once, however big it is, and never a loop over cells."""
+
+    def __init__(self, width, height, rule="life"):
+        self.width = width
+        self.height = height
+        self.cells = (1 << width*height)-1  # every cell on the board
+        col0 = sum(1 << y*width for y in range(height))
+        self.notFirst = self.cells & ~col0  # all but column 0
+        self.notLast = self.cells & ~(col0 << width-1)
+        self.board = 0
+        self.nBytes = (width*height+7)//8
+        self.setRule(rule)
+        self.setColors(0xFFFFFF)
+
+    def setRule(self, rule):
+        """Switches to <rule>, a preset name or B/S string, see parseRule()"""
+        self.births, self.survivals = parseRule(rule)
+
+    def setColors(self, on, off=0):
+        """Live cells render <on>, dead ones <off>. Builds the 8 cell colors for
+        every byte of the board once, rendering is then a lookup per byte."""
+        self.byteLut = [array('I', [on if v >> j & 1 else off for j in range(8)]).tobytes()
+                        for v in range(256)]
+
+    def randomize(self, rng, density=3):
+        """Fills the board at random from <rng>, a random.Random, with <density>
+        eighths of the cells alive: 1, 2, 3, 4 (half), 5, 6 or 7"""
+        bits = self.width*self.height
+        board = 0
+        for i in range(3):  # density in binary, lowest bit first
+            rand = rng.getrandbits(bits)
+            board = (board | rand) if density >> i & 1 else (board & rand)
+        self.board = board & self.cells
+
+    def toggle(self, x, y):
+        self.board ^= 1 << y*self.width+x
+
+    def population(self):
+        return bin(self.board).count("1")
+
+    def step(self):
+        """Advances one generation. The eight neighbour boards are added up
+        bit-sliced, count[i] holding bit i of every cell's neighbour count."""
+        b = self.board
+        w = self.width
+        west = (b << 1) & self.notFirst  # each cell's neighbour at x-1
+        east = (b >> 1) & self.notLast
+        s0 = s1 = s2 = s3 = 0
+        for n in (west, east, west << w, b << w, east << w, west >> w, b >> w, east >> w):
+            c0 = s0 & n
+            s0 ^= n
+            c1 = s1 & c0
+            s1 ^= c0
+            s3 |= s2 & c1  # counts stop at 8, nothing carries out of s3
+            s2 ^= c1
+        count = (s0, s1, s2, s3)
+
+        def equal(k):
+            mask = -1
+            for i, plane in enumerate(count):
+                mask &= plane if k >> i & 1 else ~plane
+            return mask
+
+        born = 0
+        for k in self.births:
+            born |= equal(k)
+        stay = 0
+        for k in self.survivals:
+            stay |= equal(k)
+        self.board = ((born & ~b) | (stay & b)) & self.cells
+
+    def render(self):
+        """Returns the board as an array of colors (index y*width+x)"""
+        frame = array('I')
+        frame.frombytes(b"".join(map(self.byteLut.__getitem__,
+                                     self.board.to_bytes(self.nBytes, "little"))))
+        del frame[self.width*self.height:]
+        return frame
@@ -0,0 +1,114 @@
+"""Runs modes as generators on one cooperative loop. A mode yields the seconds
+to wait before its next frame and is sent (newKeys, heldKeys) when it resumes,
+with every key pressed during the wait:
+
+    def mode():
+        while(True):
+            newKeys, heldKeys = yield 1/40
+            ...draw a frame...
+
+Long animations just yield longer waits, keys are still read every TICK, so the
+mode button ends a mode within a frame no matter what it is doing. Waits run on
+the clock module's clock, a virtual one runs modes as fast as they compute. Modes can
+spawn() more generators, e.g. an overlay, which run alongside on the same loop."""
+import backends
+import clock
+import frameSched
+import stats
+
+TICK = 1/40  # longest time between key reads
+
+current = None  # the Runtime running right now, for spawn()
+
+
+class Task:
+    def __init__(self, gen, name, deadline):
+        self.gen = gen
+        self.name = name
+        self.deadline = deadline
+        self.newKeys = []  # presses since this task last resumed
+        self.started = False
+
+
+class Runtime:
+    def __init__(self, grid):
+        self.grid = grid
+        self.tasks = []
+        self.main = None  # the mode's own task, frames are timed on it
+        self.result = None  # what the mode returned
+        self.held = []
+
+    def spawn(self, gen, name=None):
+        """Starts running generator <gen> alongside the mode, on the next tick"""
+        task = Task(gen, name or gen.__name__, clock.now())
+        self.tasks.append(task)
+        return task
+
+    def readKeys(self):
+        """Reads the keys once, returning True if the mode button was pressed"""
+        newKeys, self.held = self.grid.readKeys()
+        if(backends.modeBtn in newKeys):
+            return True
+        for task in self.tasks:
+            task.newKeys += newKeys
+        return False
+
+    def run(self, mode):
+        """Runs the generator <mode>, and anything it spawns, until it returns
+        or the mode button is pressed. Returns what the mode returned, None if
+        the mode button ended it"""
+        global current
+        main = self.main = self.spawn(mode)
+        self.result = None
+        current = self
+        try:
+            while(main in self.tasks):
+                task = min(self.tasks, key=lambda t: t.deadline)
+                now = clock.now()
+                if(task.deadline > now):
+                    clock.sleep(min(task.deadline-now, TICK))
+                    if(self.readKeys()):
+                        return
+                    continue
+                if(self.readKeys()):
+                    return
+                self.resume(task, now)
+            return self.result
+        finally:
+            for task in self.tasks:
+                task.gen.close()
+            self.tasks = []
+            current = None
+
+    def resume(self, task, now):
+        if(task is self.main):
+            stats.frameStart()
+        try:
+            if(task.started):
+                keys = (task.newKeys, self.held)
+                task.newKeys = []
+                delay = task.gen.send(keys)
+            else:
+                task.started = True
+                delay = next(task.gen)
+        except StopIteration as stop:
+            self.tasks.remove(task)
+            if(task is self.main):
+                self.result = stop.value
+            return
+        # deadlines step from the last one so the frame rate doesn't drift,
+        # but a late frame restarts the timeline rather than bursting to catch up
+        task.deadline += delay or 0
+        if(delay and task.deadline < now):
+            frameSched.overruns[task.name] = frameSched.overruns.get(task.name, 0)+1
+            task.deadline = now
+
+
+def run(mode):
+    """Runs generator <mode> on a new Runtime over the selected backend"""
+    Runtime(backends.load()).run(mode)
+
+
+def spawn(gen, name=None):
+    """Starts <gen> alongside the running mode"""
+    return current.spawn(gen, name)
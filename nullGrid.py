@@ -0,0 +1,77 @@
+import collections
+
+import frameBuffer
+import frameSched
+
+HISTORY = 600  # number of shown frames kept in memory
+
+fb = frameBuffer.FrameBuffer()
+frames = collections.deque(maxlen=HISTORY)  # LEDs of the last shown frames, strip order
+frameCount = 0
+keyScript = None  # called with the readKeys call count, returns (newKeys, heldKeys)
+keyCalls = 0
+onShow = None  # called after every shown frame
+
+
+def startup():
+    pass
+
+
+def block(thread=None):
+    """Waits for the mode <thread> to finish, there's nothing else to run"""
+    if(thread is not None):
+        thread.join()
+    frameSched.stop()
+
+
+def drawGrid(grid):
+    fb.loadGrid(grid)
+    stripShow()
+
+
+def drawFrame(frame):
+    """Writes a flat list of RGB values for every pixel (index y*WIDTH+x) to memory"""
+    fb.load(frame)
+    stripShow()
+
+
+def drawPixel(x, y, c):
+    fb.drawPixel(x, y, c)
+
+
+def setCol(c=0, n=None):
+    fb.fill(c, n)
+    stripShow()
+
+
+def setLED(n, c):
+    fb.setLED(n, c)
+
+
+def drawCanvas(canvas):
+    """Writes a flat list of RGB values for every LED (index line*LED_COLS+col) to memory"""
+    fb.loadCanvas(canvas)
+    stripShow()
+
+
+def drawLeds(leds):
+    """Writes RGB values for every LED already in strip order to memory"""
+    fb.loadLeds(leds)
+    stripShow()
+
+
+def stripShow():
+    global frameCount
+    frames.append(fb.ledFrame()[:])
+    frameCount += 1
+    if(onShow is not None):
+        onShow()
+
+
+def readKeys():
+    """Returns the scripted (newKeys, heldKeys) for this call, or nothing pressed"""
+    global keyCalls
+    keyCalls += 1
+    if(keyScript is None):
+        return ([], [])
+    return keyScript(keyCalls)
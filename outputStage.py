@@ -0,0 +1,68 @@
+import threading
+import time
+from array import array
+
+import stats
+
+
+class OutputStage:
+    """Sends frames to the LEDs from its own thread, so the wire time of one frame
+    overlaps with the mode computing the next. present() copies a frame into the
+    back buffer and swaps it to the front as soon as the previous frame is sent."""
+
+    def __init__(self, show, size, process=None):
+        """<show> is called on the output thread with the front buffer, an array
+        of <size> colors, and should block until the frame is on the LEDs.
+        <process>, if given, maps the front buffer to the colors to send first,
+        e.g. colorPipeline.ColorPipeline.process"""
+        self.show = show
+        self.process = process
+        self.front = array('I', bytes(4*size))
+        self.back = array('I', bytes(4*size))
+        self.cond = threading.Condition()
+        self.busy = False  # front buffer is handed to the output thread
+        self.frontPresses = []  # press times the front frame is the first reaction to
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(name="ledOutput", target=self.run, daemon=True)
+        self.thread.start()
+
+    def present(self, frame, presses=()):
+        """Queues <frame>, an array of colors, to be shown, only waiting if the one
+        before is still going out. <presses> are the scan times of key presses
+        this frame first reacts to, for key to photon latency."""
+        self.back[:] = frame
+        with self.cond:
+            while(self.busy):
+                self.cond.wait()
+            self.front, self.back = self.back, self.front
+            self.frontPresses = presses
+            self.busy = True
+            self.cond.notify_all()
+
+    def sync(self):
+        """Waits until every presented frame has been shown"""
+        with self.cond:
+            while(self.busy):
+                self.cond.wait()
+
+    def run(self):
+        while(True):
+            with self.cond:
+                while(not self.busy):
+                    self.cond.wait()
+            start = time.monotonic()
+            frame = self.front
+            if(self.process is not None):
+                frame = self.process(frame)
+                stats.record("color", time.monotonic()-start)
+                start = time.monotonic()
+            self.show(frame)
+            shown = time.monotonic()
+            stats.record("show", shown-start)
+            for t in self.frontPresses:
+                stats.record("keyToPhoton", shown-t)
+            with self.cond:
+                self.busy = False
+                self.cond.notify_all()
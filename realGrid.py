@@ -5,28 +5,29 @@
 # Direct port of the Arduino NeoPixel library strandtest example.  Showcases
 # various animations on a strip of NeoPixels.
 
-from rpi_ws281x import *
-from neopixel import *
-import digitalio
-import adafruit_matrixkeypad
-import board
-
-
-# LED strip configuration:
-LED_COUNT = 384       # Number of LED pixels.
-LED_PIN = 18      # GPIO pin connected to the pixels (18 uses PWM!).
-# LED_PIN        = 10      # GPIO pin connected to the pixels (10 uses SPI /dev/spidev0.0).
+import signal
+import threading
+from functools import partial
+
+import colorPipeline
+import frameBuffer
+import frameSched
+import geometry
+import keyScanner
+import ledStrip
+import outputStage
+import stats
+
+
+# LED strip configuration, each panel's pin and LED count come from the geometry,
+# which also groups them into ws281x devices, see geometry.outputs()
+LED_COUNT = frameBuffer.LED_COUNT       # Number of LED pixels, on all panels.
 LED_FREQ_HZ = 800000  # LED signal frequency in hertz (usually 800khz)
-LED_DMA = 10      # DMA channel to use for generating signal (try 10)
-LED_BRIGHTNESS = 255     # Set to 0 for darkest and 255 for brightest
+LED_BRIGHTNESS = 255     # Leave at 255, brightness is set in ledBoard.conf, see colorPipeline
 # True to invert the signal (when using NPN transistor level shift)
 LED_INVERT = False
-LED_CHANNEL = 0       # set to '1' for GPIOs 13, 19, 41, 45 or 53
 
-cols = [digitalio.DigitalInOut(x) for x in (
-    board.D23, board.D24, board.D25, board.D8, board.D7, board.D12, board.D16, board.D20)]
-rows = [digitalio.DigitalInOut(x) for x in (
-    board.D4, board.D17, board.D27, board.D22, board.D10, board.D6, board.D11, board.D5)]
+# the keypad is wired to the panel at the bottom left
 keys = ((0,  1,  2,  3,  4,  5,  6,  7),
         (8,  9, 10, 11, 12, 13, 14, 15),
         (16, 17, 18, 19, 20, 21, 22, 23),
@@ -35,67 +36,145 @@ keys = ((0,  1,  2,  3,  4,  5,  6,  7),
         (40, 41, 42, 43, 44, 45, 46, 47),
         (48, 49, 50, 51, 52, 53, 54, 55),
         (56, 57, 58, 59, 60, 61, 62, 63))
-keypad = adafruit_matrixkeypad.Matrix_Keypad(rows, cols, keys)
+fb = frameBuffer.FrameBuffer()
+# hardware objects, created by startup(), one strip and output worker per device
+strips = []
+outputs = []
+deviceLeds = []  # for each device, the board strip slices of its panels in send order
+cols = []
+rows = []
+keypad = None
+scanner = None
 
 
 def startup():
-    """Create NeoPixel object with appropriate configuration."""
-    global strip, _run
-    strip = Adafruit_NeoPixel(
-        LED_COUNT, LED_PIN, LED_FREQ_HZ, LED_DMA, LED_INVERT, LED_BRIGHTNESS, LED_CHANNEL)
-    # Intialize the library (must be called once before other functions).
-    strip.begin()
-
-
-def block():
-    """Block Thread until keyboard interrupt. TKinter needs this to start its GUI listener"""
-    try:
-        while(True):
-            pass
-    except KeyboardInterrupt:
-        setCol()
+    """Create the LED strips with appropriate configuration, then set up the keypad.
+    The hardware libraries are only imported here, so this module imports anywhere."""
+    global cols, rows, keypad, scanner
+    for dma, device in enumerate(geometry.board.outputs(), 10):
+        # each channel sends its chained panels one after the other
+        strip = ledStrip.LedStrip([(channel, pin, sum(panel.count for panel in chain))
+                                   for channel, pin, chain in device],
+                                  LED_FREQ_HZ, dma, LED_INVERT, LED_BRIGHTNESS)
+        # Intialize the library (must be called once before other functions).
+        strip.begin()
+        strips.append(strip)
+        # devices flush in parallel, each from its own output thread, and share
+        # the supply's current budget by their number of LEDs
+        panels = [panel for __, __, chain in device for panel in chain]
+        count = sum(panel.count for panel in panels)
+        pipeline = colorPipeline.fromConfig(count, count/LED_COUNT)
+        output = outputStage.OutputStage(partial(showFrame, strip), count, pipeline.process)
+        output.start()
+        outputs.append(output)
+        deviceLeds.append([slice(panel.start, panel.start+panel.count) for panel in panels])
+
+    import adafruit_matrixkeypad
+    import board
+    import digitalio
+    cols = [digitalio.DigitalInOut(x) for x in (
+        board.D23, board.D24, board.D25, board.D8, board.D7, board.D12, board.D16, board.D20)]
+    rows = [digitalio.DigitalInOut(x) for x in (
+        board.D4, board.D17, board.D27, board.D22, board.D10, board.D6, board.D11, board.D5)]
+    keypad = adafruit_matrixkeypad.Matrix_Keypad(rows, cols, keys)
+    scanner = keyScanner.KeyScanner(lambda: keypad.pressed_keys)
+    scanner.start()
+
+
+def block(thread=None):
+    """Block Thread until SIGINT or SIGTERM, then stop the mode <thread> and turn the board off"""
+    stopped = threading.Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: stopped.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+    stopped.wait()
+    shutdown(thread)
+
+
+def shutdown(thread=None):
+    """Stops the mode thread, blanks the strip and releases the keypad pins"""
+    frameSched.stop()
+    if(thread is not None):
+        thread.join(timeout=2)
+    scanner.join(timeout=1)
+    setCol()
+    for output in outputs:
+        output.sync()
+    for strip in strips:
+        strip.close()
+    for pin in rows + cols:
+        pin.deinit()
 
 
 def drawGrid(grid):
     """Writes RGB color values in <grid> to actual hardware"""
-    for y, row in enumerate(grid):
-        for x, val in enumerate(row):
-            drawPixel(x, y, val)
-    strip.show()
+    fb.loadGrid(grid)
+    stripShow()
+
+
+def drawFrame(frame):
+    """Writes a flat list of RGB values for every pixel (index y*WIDTH+x) to actual hardware"""
+    fb.load(frame)
+    stripShow()
 
 
 def drawPixel(x, y, c):
     """Writes RGB value to a specific pixel in the board buffer.
     stripShow MUST be called after to actually send colors to the board."""
-    tStart = y*48-x*3+45
-    bStart = y*48+x*3
-    strip.setPixelColor(bStart, c)
-    strip.setPixelColor(bStart+1, c)
-    strip.setPixelColor(bStart+2, c)
-    strip.setPixelColor(tStart, c)
-    strip.setPixelColor(tStart+1, c)
-    strip.setPixelColor(tStart+2, c)
+    fb.drawPixel(x, y, c)
 
 
-def setCol(c=0, n=range(384)):
-    for i in n:
-        strip.setPixelColor(i, c)
-    strip.show()
+def setCol(c=0, n=None):
+    """Sets every pixel, or only the logical indices in <n>, and shows it"""
+    fb.fill(c, n)
+    stripShow()
+
+
+def setLED(n, c):
+    """Writes RGB value to the LED at strip index <n>, at full resolution.
+    stripShow MUST be called after to actually send colors to the board."""
+    fb.setLED(n, c)
+
+
+def drawCanvas(canvas):
+    """Writes a flat list of RGB values for every LED addressed by physical position
+    (index line*LED_COLS+col) to actual hardware"""
+    fb.loadCanvas(canvas)
+    stripShow()
+
+
+def drawLeds(leds):
+    """Writes RGB values for every LED already in strip order to actual hardware"""
+    fb.loadLeds(leds)
+    stripShow()
 
 
 def stripShow():
-    strip.show()
+    """Hands the frame to the output thread, returning while it is sent"""
+    stats.rendered()
+    leds = fb.ledFrame()
+    presses = stats.takePresses()
+    for slices, output in zip(deviceLeds, outputs):
+        frame = leds[slices[0]]
+        for panelLeds in slices[1:]:
+            frame += leds[panelLeds]
+        output.present(frame, presses)
+        presses = ()  # key to photon is timed on the first device
+
+
+def showFrame(strip, leds):
+    """Runs on a device's output thread, copies its LEDs into the ws281x
+    buffers with a memmove per channel and sends them"""
+    strip.show(leds)
 
 
 def readKeys():
     """Returns newly pressed keys, as well as all keys being held
-    (List newKeys, List pressedKeys)"""
-    global lastKeys
-    keys = keypad.pressed_keys
-    # print(keys)
-    heldKeys = []
-    for k in keys:  # find new key presses
-        heldKeys.append((k % 8, int(k/8)))
-    newKeys = [i for i in heldKeys if i not in lastKeys]
-    lastKeys = heldKeys
+    (List newKeys, List pressedKeys). Presses come from the scanner thread's
+    queue, so taps shorter than a frame still show up in newKeys."""
+    newKeys = []
+    for t, k, pressed in scanner.drain():
+        if(pressed):
+            newKeys.append((k % 8, k//8))
+            stats.pressed(t)
+    heldKeys = [(k % 8, k//8) for k in scanner.held]
     return (newKeys, heldKeys)
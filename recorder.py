@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""Records what the board showed and the keys read to a compact binary file,
+and replays recordings on any backend.
+
+    LEDBOARD_RECORD=session.rec python3 boardV2.py    # or 'record = ...' in ledBoard.conf
+    python3 recorder.py session.rec [--speed 4] [--start 60] [--backend tk]
+    python3 recorder.py session.rec --diff other.rec
+
+The file is little endian:
+    header   b"LEDREC1\\n", uint32 LED count, float64 wall clock start time
+    records  uint8 type, float64 seconds since the start, then by type
+               K  keyframe, every LED in strip order as R, G, B bytes
+               D  delta from the frame before, uint16 n, n uint16 LED indices,
+                  then their n R, G, B triples
+               E  keys read, uint8 new count, uint8 held count, a byte y*8+x per key
+    index    uint64 file offset of every frame record
+    trailer  uint64 index offset, uint32 frame count, b"LEDIDX1\\n"
+The index is written on close, a recording cut short is indexed by one scan
+when it's opened. Every KEYFRAME_EVERY frames is a keyframe, so seeking to any
+frame decodes at most that many records however long the recording is."""
+import argparse
+import atexit
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+
+import backends
+import frameBuffer
+import frameSched
+from colorTables import blueByte, greenByte, redByte
+
+MAGIC = b"LEDREC1\n"
+INDEX_MAGIC = b"LEDIDX1\n"
+HEAD = struct.Struct("<8sId")
+RECORD = struct.Struct("<Bd")
+COUNT = struct.Struct("<H")
+KEYS = struct.Struct("<BB")
+TRAILER = struct.Struct("<QI8s")
+KEYFRAME = ord("K")
+DELTA = ord("D")
+EVENTS = ord("E")
+KEYFRAME_EVERY = 120
+
+
+class Recorder:
+    """Appends frames and key reads to a recording at <path>"""
+
+    def __init__(self, path, count=frameBuffer.LED_COUNT, delta=True):
+        """<delta> stores frames as the LEDs that changed when that's smaller"""
+        self.file = open(path, "wb")
+        self.count = count
+        self.delta = delta
+        self.start = time.monotonic()
+        self.prev = array('I', bytes(4*count))
+        self.rgb = bytearray(3*count)
+        self.offsets = array('Q')
+        self.sinceKey = KEYFRAME_EVERY  # frames since the last keyframe
+        self.held = []
+        self.pos = 0
+        self.write(HEAD.pack(MAGIC, count, time.time()))
+
+    def write(self, data):
+        self.file.write(data)
+        self.pos += len(data)
+
+    def frame(self, leds):
+        """Records <leds>, an array of colors in strip order, as shown now"""
+        t = time.monotonic()-self.start
+        self.offsets.append(self.pos)
+        if(self.delta and self.sinceKey < KEYFRAME_EVERY):
+            changed = [i for i, (c, old) in enumerate(zip(leds, self.prev)) if c != old]
+            if(len(changed)*5+COUNT.size < 3*self.count):
+                self.write(RECORD.pack(DELTA, t) + COUNT.pack(len(changed))
+                           + array('H', changed).tobytes()
+                           + b"".join(leds[i].to_bytes(3, "big") for i in changed))
+                for i in changed:
+                    self.prev[i] = leds[i]
+                self.sinceKey += 1
+                return
+        src = memoryview(leds).cast('B')
+        self.rgb[0::3] = src[redByte::4]
+        self.rgb[1::3] = src[greenByte::4]
+        self.rgb[2::3] = src[blueByte::4]
+        self.write(RECORD.pack(KEYFRAME, t) + self.rgb)
+        self.prev[:] = leds
+        self.sinceKey = 1
+
+    def keys(self, newKeys, heldKeys):
+        """Records a readKeys() result, if anything is pressed or was released"""
+        if(not newKeys and heldKeys == self.held):
+            return
+        self.held = list(heldKeys)
+        self.write(RECORD.pack(EVENTS, time.monotonic()-self.start)
+                   + KEYS.pack(len(newKeys), len(heldKeys))
+                   + bytes(y*8+x for x, y in list(newKeys)+list(heldKeys)))
+
+    def close(self):
+        if(self.file.closed):
+            return
+        indexOffset = self.pos
+        self.write(self.offsets.tobytes())
+        self.write(TRAILER.pack(indexOffset, len(self.offsets), INDEX_MAGIC))
+        self.file.close()
+
+
+def install(grid, path):
+    """Records every frame backend module <grid> shows and every key it reads
+    to <path>, closing the recording at exit"""
+    rec = Recorder(path)
+    show = grid.stripShow
+    readKeys = grid.readKeys
+
+    def stripShow():
+        show()
+        rec.frame(grid.fb.leds)  # every backend's stripShow fills fb.leds
+
+    def recordKeys():
+        newKeys, heldKeys = readKeys()
+        rec.keys(newKeys, heldKeys)
+        return (newKeys, heldKeys)
+
+    # the backends' drawing functions call stripShow by its module name
+    grid.stripShow = stripShow
+    grid.readKeys = recordKeys
+    atexit.register(rec.close)
+    return rec
+
+
+def start(grid):
+    """Starts recording <grid> if $LEDBOARD_RECORD or the config's 'record'
+    line names a file, returning the Recorder or None"""
+    path = os.environ.get("LEDBOARD_RECORD") or backends.readConfig().get("record")
+    return install(grid, path) if path else None
+
+
+class Recording:
+    """A recording opened with mmap, frames are decoded on demand"""
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+        magic, self.count, self.started = HEAD.unpack_from(self.map)
+        if(magic != MAGIC):
+            raise ValueError("{} is not a board recording".format(path))
+        self.leds = array('I', bytes(4*self.count))
+        self.ledBytes = memoryview(self.leds).cast('B')
+        self.decoded = None  # frame number now in self.leds
+        self.end = len(self.map)
+        if(self.end >= HEAD.size+TRAILER.size):
+            indexOffset, frames, magic = TRAILER.unpack_from(self.map, self.end-TRAILER.size)
+            if(magic == INDEX_MAGIC):
+                self.offsets = self.view[indexOffset:indexOffset+8*frames].cast('Q')
+                self.end = indexOffset
+                return
+        self.offsets = self.scan()
+
+    def scan(self):
+        """Finds every frame record, for recordings that weren't closed"""
+        offsets = array('Q')
+        pos = HEAD.size
+        while(pos < self.end):
+            try:
+                size = self.recordSize(pos)
+            except struct.error:
+                break  # the last record was cut off
+            if(pos+size > self.end):
+                break
+            if(self.map[pos] != EVENTS):
+                offsets.append(pos)
+            pos += size
+        return offsets
+
+    def recordSize(self, pos):
+        kind = self.map[pos]
+        body = pos+RECORD.size
+        if(kind == KEYFRAME):
+            return RECORD.size+3*self.count
+        if(kind == DELTA):
+            return RECORD.size+COUNT.size+5*COUNT.unpack_from(self.map, body)[0]
+        if(kind == EVENTS):
+            return RECORD.size+KEYS.size+sum(KEYS.unpack_from(self.map, body))
+        raise ValueError("bad record type {} at {}".format(kind, pos))
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def time(self, i):
+        """Seconds from the start of the recording to frame <i>"""
+        return RECORD.unpack_from(self.map, self.offsets[i])[1]
+
+    def seek(self, t):
+        """The first frame at or after <t> seconds, by binary search"""
+        lo, hi = 0, len(self)
+        while(lo < hi):
+            mid = (lo+hi)//2
+            if(self.time(mid) < t):
+                lo = mid+1
+            else:
+                hi = mid
+        return lo
+
+    def frame(self, i):
+        """The LEDs of frame <i> in strip order, an array reused every call"""
+        if(self.decoded is not None and self.decoded < i and i-self.decoded <= KEYFRAME_EVERY):
+            first = self.decoded+1
+        else:
+            first = i
+            while(self.map[self.offsets[first]] != KEYFRAME):
+                first -= 1
+        for n in range(first, i+1):
+            self.apply(self.offsets[n])
+        self.decoded = i
+        return self.leds
+
+    def apply(self, pos):
+        body = pos+RECORD.size
+        if(self.map[pos] == KEYFRAME):
+            src = self.view[body:body+3*self.count]
+            self.ledBytes[redByte::4] = src[0::3]
+            self.ledBytes[greenByte::4] = src[1::3]
+            self.ledBytes[blueByte::4] = src[2::3]
+            return
+        n = COUNT.unpack_from(self.map, body)[0]
+        body += COUNT.size
+        indices = self.view[body:body+2*n].cast('H')
+        rgb = body+2*n
+        for j, led in enumerate(indices):
+            self.leds[led] = int.from_bytes(self.map[rgb+3*j:rgb+3*j+3], "big")
+
+    def events(self, i):
+        """(time, newKeys, heldKeys) for each key read between frame <i> and the next"""
+        pos = self.offsets[i]
+        end = self.offsets[i+1] if i+1 < len(self) else self.end
+        out = []
+        while(pos < end):
+            if(self.map[pos] == EVENTS):
+                t = RECORD.unpack_from(self.map, pos)[1]
+                new, held = KEYS.unpack_from(self.map, pos+RECORD.size)
+                keys = [(k % 8, k//8) for k in self.map[pos+RECORD.size+KEYS.size:pos+RECORD.size+KEYS.size+new+held]]
+                out.append((t, keys[:new], keys[new:]))
+            pos += self.recordSize(pos)
+        return out
+
+    def close(self):
+        if(isinstance(self.offsets, memoryview)):
+            self.offsets.release()
+        self.view.release()
+        self.ledBytes.release()
+        self.map.close()
+        self.file.close()
+
+
+def play(rec, grid, start=0, speed=1, keys=False):
+    """Shows <rec> on backend <grid> from <start> seconds, at <speed> times real
+    time or as fast as possible for 0, printing the recorded key presses if <keys>"""
+    first = rec.seek(start)
+    if(first >= len(rec)):
+        return
+    t0 = rec.time(first)
+    wall0 = time.monotonic()
+    try:
+        for i in range(first, len(rec)):
+            if(speed):
+                frameSched.sleep(wall0+(rec.time(i)-t0)/speed-time.monotonic())
+            grid.drawLeds(rec.frame(i))
+            if(keys):
+                for t, newKeys, __ in rec.events(i):
+                    if(newKeys):
+                        print("{:10.3f}s pressed {}".format(t, newKeys))
+    except frameSched.Shutdown:
+        return
+
+
+def diff(a, b):
+    """Prints the frames where recordings <a> and <b> differ, returning how many did"""
+    differ = 0
+    for i in range(min(len(a), len(b))):
+        leds = b.frame(i)
+        changed = sum(1 for x, y in zip(a.frame(i), leds) if x != y)
+        if(changed):
+            differ += 1
+            print("frame {} at {:.3f}s: {} LEDs differ".format(i, a.time(i), changed))
+    if(len(a) != len(b)):
+        print("lengths differ: {} and {} frames".format(len(a), len(b)))
+    return differ
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay or compare board recordings")
+    parser.add_argument("path")
+    parser.add_argument("--speed", type=float, default=1, help="times real time, 0 for flat out")
+    parser.add_argument("--start", type=float, default=0, help="seconds into the recording")
+    parser.add_argument("--backend", help="backend to play on, defaults to the configured one")
+    parser.add_argument("--keys", action="store_true", help="print the recorded key presses")
+    parser.add_argument("--diff", metavar="OTHER", help="compare frame by frame with another recording")
+    args = parser.parse_args()
+
+    rec = Recording(args.path)
+    duration = rec.time(len(rec)-1) if len(rec) else 0
+    print("{} frames over {:.1f}s, recorded {}".format(
+        len(rec), duration, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(rec.started))))
+    if(args.diff):
+        other = Recording(args.diff)
+        print("{} frames differ".format(diff(rec, other)))
+        return
+    grid = backends.load(args.backend)
+    backends.startup()
+    thread = threading.Thread(name="replay", target=play, daemon=True,
+                              args=(rec, grid, args.start, args.speed, args.keys))
+    thread.start()
+    grid.block(thread)
+
+
+if __name__ == '__main__':
+    main()
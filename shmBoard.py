@@ -0,0 +1,184 @@
+"""Output daemon: owns the strip and keypad through a normal backend and shares
+them with mode processes over one multiprocessing.shared_memory block, so modes
+render on another core without stalling the scan and output threads.
+
+    python3 shmBoard.py [backend]              # on the Pi, owns the hardware
+    LEDBOARD_BACKEND=shm python3 boardV2.py    # modes, in their own process
+
+The block holds a small header, two frame slots of 384 LEDs in strip order and
+a ring of key press events. A mode writes the slot the daemon isn't reading and
+bumps the header's frame count, which the daemon polls. A reader that sees the
+count move while it copied a slot just copies the newer frame. The header
+holds the daemon's pid, a second daemon refuses to start while it's running."""
+import os
+import signal
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import backends
+import frameBuffer
+import frameSched
+
+NAME = os.environ.get("LEDBOARD_SHM", "ledBoard")
+RATE = 200  # how often the daemon checks for frames and keys, per second
+RING = 256  # key events kept for the mode process
+
+# header words
+SEQ = 0  # frames written, the newest is in slot SEQ % 2
+HEAD = 1  # key events written, the newest is at (HEAD-1) % RING
+HELD_LO = 2  # keys held, bit y*8+x, in two words
+HELD_HI = 3
+PID = 4  # the daemon's process id
+HEADER_WORDS = 8
+
+FRAME_OFFSET = HEADER_WORDS*4
+TIMES_OFFSET = FRAME_OFFSET + 2*frameBuffer.LED_COUNT*4
+KEYS_OFFSET = TIMES_OFFSET + RING*8
+SIZE = KEYS_OFFSET + RING*4
+
+
+def daemonPid(shm):
+    """The process id in block <shm>'s header if that process is still running"""
+    if(shm.size < FRAME_OFFSET):
+        return None
+    header = shm.buf[:FRAME_OFFSET].cast('I')
+    pid = header[PID]
+    header.release()
+    if(pid in (0, os.getpid())):
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None
+    except PermissionError:
+        pass  # alive, under another user
+    return pid
+
+
+class SharedBoard:
+    """Typed views over the shared block, for both the daemon and the modes"""
+
+    def __init__(self, create=False, name=NAME):
+        if(create):
+            try:  # a daemon that died without cleaning up leaves its block behind
+                stale = shared_memory.SharedMemory(name)
+            except FileNotFoundError:
+                pass
+            else:
+                resource_tracker.unregister(stale._name, "shared_memory")  # see below
+                pid = daemonPid(stale)
+                stale.close()
+                if(pid is not None):
+                    raise RuntimeError("{} is shared by a running daemon, pid {}".format(name, pid))
+                stale.unlink()
+            self.shm = shared_memory.SharedMemory(name, create=True, size=SIZE)
+        else:
+            self.shm = shared_memory.SharedMemory(name)
+            # before 3.13 attaching also registers the block with this process's
+            # resource tracker, which would unlink it when the mode exits
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        buf = self.shm.buf
+        self.header = buf[:FRAME_OFFSET].cast('I')
+        n = frameBuffer.LED_COUNT
+        frames = buf[FRAME_OFFSET:TIMES_OFFSET].cast('I')
+        self.slots = (frames[:n], frames[n:])
+        self.times = buf[TIMES_OFFSET:KEYS_OFFSET].cast('d')
+        self.keys = buf[KEYS_OFFSET:SIZE].cast('I')
+        if(create):
+            self.header[PID] = os.getpid()
+
+    def writeFrame(self, leds):
+        """Publishes <leds>, an array of 384 colors in strip order"""
+        seq = self.header[SEQ]+1
+        self.slots[seq % 2][:] = leds
+        self.header[SEQ] = seq & 0xFFFFFFFF
+
+    def readFrame(self, out, seen):
+        """Copies the newest frame into array <out> if it is newer than frame
+        count <seen>, returning the count of the frame in <out>"""
+        seq = self.header[SEQ]
+        dst = memoryview(out)
+        while(seq != seen):
+            dst[:] = self.slots[seq % 2]
+            if(self.header[SEQ] == seq):  # not overwritten while copying
+                return seq
+            seq = self.header[SEQ]
+        return seen
+
+    def pushKeys(self, newKeys, heldKeys, t):
+        """Adds the presses <newKeys> at monotonic time <t> to the ring and
+        publishes <heldKeys>"""
+        head = self.header[HEAD]
+        for x, y in newKeys:
+            self.times[head % RING] = t
+            self.keys[head % RING] = y*8+x
+            head = (head+1) & 0xFFFFFFFF
+        held = 0
+        for x, y in heldKeys:
+            held |= 1 << (y*8+x)
+        self.header[HELD_LO] = held & 0xFFFFFFFF
+        self.header[HELD_HI] = held >> 32
+        self.header[HEAD] = head
+
+    def readKeys(self, seen):
+        """Returns (count, [(time, (x, y)), ...], heldKeys) for the presses after
+        event count <seen>, dropping any the ring has already overwritten"""
+        head = self.header[HEAD]
+        events = []
+        for i in range(max(seen, head-RING), head):
+            key = self.keys[i % RING]
+            events.append((self.times[i % RING], (key % 8, key//8)))
+        held = self.header[HELD_LO] | self.header[HELD_HI] << 32
+        heldKeys = [(i % 8, i//8) for i in range(64) if held >> i & 1]
+        return head, events, heldKeys
+
+    def close(self, unlink=False):
+        self.header.release()
+        for view in self.slots + (self.times, self.keys):
+            view.release()
+        self.shm.close()
+        if(unlink):
+            self.shm.unlink()
+
+
+def pump(board, grid):
+    """Runs on the daemon: shows new frames from the modes and passes keys back"""
+    sched = frameSched.FrameScheduler(1/RATE, "shmPump")
+    leds = frameBuffer.FrameBuffer().leds
+    seen = board.header[SEQ]
+    try:
+        while(True):
+            newKeys, heldKeys = grid.readKeys()
+            if(newKeys or board.header[HELD_LO] or board.header[HELD_HI] or heldKeys):
+                board.pushKeys(newKeys, heldKeys, time.monotonic())
+            seq = board.readFrame(leds, seen)
+            if(seq != seen):
+                seen = seq
+                grid.drawLeds(leds)
+            sched.wait()
+    except frameSched.Shutdown:
+        return
+
+
+def main(name=None):
+    if((name or backends.selected()) == "shm"):
+        raise SystemExit("the daemon needs a real backend, not shm")
+    board = SharedBoard(create=True)  # before the hardware, in case a daemon already has it
+    try:
+        grid = backends.load(name)
+        backends.startup()
+        grid.setCol()
+        # stop on SIGTERM like on Ctrl-C, so the block is always unlinked
+        signal.signal(signal.SIGTERM, lambda signum, frame: signal.raise_signal(signal.SIGINT))
+        print("Sharing the board as {} ({} bytes)".format(NAME, SIZE))
+        thread = threading.Thread(name="shmPump", target=pump, args=(board, grid), daemon=True)
+        thread.start()
+        grid.block(thread)
+    finally:
+        board.close(unlink=True)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
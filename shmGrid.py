@@ -0,0 +1,92 @@
+import time
+
+import frameBuffer
+import frameSched
+import shmBoard
+import stats
+
+fb = frameBuffer.FrameBuffer()
+board = None  # shmBoard.SharedBoard, attached by startup()
+keysSeen = 0  # key events already read from the ring
+
+
+def startup():
+    """Attaches to the output daemon's shared block, start it with python3 shmBoard.py"""
+    global board, keysSeen
+    try:
+        board = shmBoard.SharedBoard()
+    except FileNotFoundError:
+        raise RuntimeError("no output daemon is sharing {}, start it with python3 shmBoard.py".format(
+            shmBoard.NAME)) from None
+    keysSeen = board.header[shmBoard.HEAD]
+
+
+def block(thread=None):
+    """Waits for the mode <thread> until Ctrl-C, the daemon keeps the board lit"""
+    try:
+        if(thread is not None):
+            thread.join()
+    except KeyboardInterrupt:
+        pass
+    frameSched.stop()
+    if(thread is not None):
+        thread.join(timeout=2)
+    board.close()
+
+
+def drawGrid(grid):
+    fb.loadGrid(grid)
+    stripShow()
+
+
+def drawFrame(frame):
+    """Writes a flat list of RGB values for every pixel (index y*WIDTH+x) to the shared frame"""
+    fb.load(frame)
+    stripShow()
+
+
+def drawPixel(x, y, c):
+    fb.drawPixel(x, y, c)
+
+
+def setCol(c=0, n=None):
+    fb.fill(c, n)
+    stripShow()
+
+
+def setLED(n, c):
+    fb.setLED(n, c)
+
+
+def drawCanvas(canvas):
+    """Writes a flat list of RGB values for every LED (index line*LED_COLS+col) to the shared frame"""
+    fb.loadCanvas(canvas)
+    stripShow()
+
+
+def drawLeds(leds):
+    """Writes RGB values for every LED already in strip order to the shared frame"""
+    fb.loadLeds(leds)
+    stripShow()
+
+
+def stripShow():
+    """Publishes the frame to the daemon, which shows it on its next poll.
+    Key to photon is timed to the publish, the daemon's poll adds up to 1/RATE."""
+    stats.rendered()
+    presses = stats.takePresses()
+    board.writeFrame(fb.ledFrame())
+    published = time.monotonic()
+    for t in presses:
+        stats.record("keyToPhoton", published-t)
+
+
+def readKeys():
+    """Returns the keys pressed since the last call and the keys held, as seen by the daemon"""
+    global keysSeen
+    keysSeen, events, heldKeys = board.readKeys(keysSeen)
+    newKeys = []
+    for t, key in events:
+        stats.pressed(t)
+        newKeys.append(key)
+    return (newKeys, heldKeys)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Soak test: runs boardV2's mode rotation on the null backend and a virtual
+clock, pressing random keys and the mode button every few simulated minutes,
+for hours or days of simulated uptime. Prints the simulated time, a checksum of
+every frame shown and, if a mode crashed, where. The same seed gives the same
+run, frame for frame.
+
+    python3 soak.py [--hours 24] [--seed N] [--switch MINUTES]
+"""
+import argparse
+import random
+import time
+import traceback
+import zlib
+
+import backends
+backends.load("null")  # before boardV2 picks up the configured backend
+import boardV2
+import clock
+import frameSched
+import nullGrid
+import stats
+import udpStream
+
+
+def keyScript(seed, end, switch, pressRate=.05):
+    """Returns a nullGrid key script pressing random keys, the mode button every
+    <switch> simulated seconds and stopping the board at simulated time <end>"""
+    rng = random.Random(seed)
+    held = []
+    nextSwitch = [switch]
+
+    def script(call):
+        now = clock.now()
+        if(now >= end):
+            frameSched.stop()
+        if(now >= nextSwitch[0]):
+            nextSwitch[0] += switch
+            return ([boardV2.modeBtn], [boardV2.modeBtn])
+        if(held and rng.random() < .3):
+            held.pop(0)
+        newKeys = []
+        if(rng.random() < pressRate):
+            key = (rng.randrange(8), rng.randrange(8))
+            if(key != boardV2.modeBtn):
+                newKeys.append(key)
+                held.append(key)
+        return (newKeys, list(held))
+    return script
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run every mode for simulated hours")
+    parser.add_argument("--hours", type=float, default=24, help="simulated hours to run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--switch", type=float, default=10, help="simulated minutes per mode")
+    args = parser.parse_args()
+
+    clock.use(clock.VirtualClock())
+    # an ephemeral loopback port no sender knows, so the stream mode never binds
+    # over a running board and nothing from outside changes the run
+    udpStream.HOST = "127.0.0.1"
+    udpStream.PORT = 0
+    clock.rng.seed(args.seed)
+    nullGrid.keyScript = keyScript(args.seed, args.hours*3600, args.switch*60)
+    crc = [0]
+
+    def onShow():
+        crc[0] = zlib.crc32(nullGrid.fb.leds, crc[0])
+    nullGrid.onShow = onShow
+
+    start = time.perf_counter()
+    failed = False
+    try:
+        boardV2.mainLoop()
+    except Exception:
+        failed = True
+        traceback.print_exc()
+        print("mode {} crashed after {:.3f} simulated seconds, seed {}".format(
+            stats.mode, clock.now(), args.seed))
+    real = time.perf_counter()-start
+    print("{:.1f} simulated hours in {:.1f}s ({:.0f}x), {} frames, checksum {:08x}".format(
+        clock.now()/3600, real, clock.now()/max(real, 1e-9), nullGrid.frameCount, crc[0]))
+    if(failed):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
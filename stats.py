@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Frame timing counters for the board. Every metric keeps the last WINDOW
+samples per mode in a ring buffer, so recording is one array store and the
+percentiles are only worked out when a report is asked for.
+
+Run this file to print the report from a board serving it on SOCKET_PATH."""
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from array import array
+
+import frameSched
+
+WINDOW = 512  # samples kept per metric
+SOCKET_PATH = os.environ.get("LEDBOARD_STATS_SOCKET", "/tmp/ledBoard.stats")
+DUMP_INTERVAL = float(os.environ.get("LEDBOARD_STATS_INTERVAL", 0))  # 0 never dumps
+
+mode = "boot"  # mode the samples are filed under
+metrics = {}  # mode -> metric name -> Rolling
+frameStarted = None  # when the current frame's rendering began
+pendingPresses = []  # press times read by the mode but not yet presented
+
+
+class Rolling:
+    """The last <size> samples of a metric, in seconds"""
+
+    def __init__(self, size=WINDOW):
+        self.samples = array('d', bytes(8*size))
+        self.count = 0
+
+    def record(self, value):
+        self.samples[self.count % len(self.samples)] = value
+        self.count += 1
+
+    def summary(self):
+        data = sorted(self.samples[:min(self.count, len(self.samples))])
+        return (self.count, data[len(data)//2], data[min(int(len(data)*.99), len(data)-1)], data[-1])
+
+
+def setMode(name):
+    global mode, frameStarted
+    mode = name
+    frameStarted = None
+
+
+def record(name, value):
+    """Adds a sample of <value> seconds to metric <name> for the current mode"""
+    modeMetrics = metrics.setdefault(mode, {})
+    if(name not in modeMetrics):
+        modeMetrics[name] = Rolling()
+    modeMetrics[name].record(value)
+
+
+def frameStart():
+    """Marks the start of a frame, called when the frame scheduler wakes up"""
+    global frameStarted
+    frameStarted = time.monotonic()
+
+
+def rendered():
+    """Records the time since frameStart, called when the mode shows its frame"""
+    if(frameStarted is not None):
+        record("render", time.monotonic()-frameStarted)
+
+
+def pressed(t):
+    """Notes a key press the mode has read, scanned at monotonic time <t>"""
+    pendingPresses.append(t)
+
+
+def takePresses():
+    """Returns the press times the frame being shown now reacts to"""
+    global pendingPresses
+    presses = pendingPresses
+    pendingPresses = []
+    return presses
+
+
+def report():
+    lines = []
+    for modeName, modeMetrics in metrics.items():
+        lines.append("{} (overruns {})".format(modeName, frameSched.overruns.get(modeName, 0)))
+        for name, rolling in sorted(modeMetrics.items()):
+            count, p50, p99, worst = rolling.summary()
+            lines.append("  {:<12} n={:<8} p50={:7.2f}ms p99={:7.2f}ms max={:7.2f}ms".format(
+                name, count, p50*1000, p99*1000, worst*1000))
+    return "\n".join(lines)+"\n"
+
+
+class _ReportHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.wfile.write(report().encode())
+
+
+def serve(path=SOCKET_PATH):
+    """Sends the report to anything that connects to the UNIX socket at <path>"""
+    if(os.path.exists(path)):
+        os.unlink(path)
+    server = socketserver.UnixStreamServer(path, _ReportHandler)
+    threading.Thread(name="stats", target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def dumpEvery(interval, out=sys.stderr):
+    """Writes the report to <out> every <interval> seconds"""
+    def dump():
+        while(True):
+            time.sleep(interval)
+            out.write(report())
+            out.flush()
+    threading.Thread(name="statsDump", target=dump, daemon=True).start()
+
+
+def start():
+    """Serves the report on SOCKET_PATH, and dumps it every DUMP_INTERVAL if set"""
+    serve(SOCKET_PATH)
+    if(DUMP_INTERVAL > 0):
+        dumpEvery(DUMP_INTERVAL)
+
+
+if __name__ == '__main__':
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(sys.argv[1] if len(sys.argv) > 1 else SOCKET_PATH)
+        sys.stdout.write(sock.makefile().read())
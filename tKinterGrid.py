@@ -1,63 +1,131 @@
 import tkinter as tk
 import threading
+from functools import lru_cache
+
+import frameBuffer
+import frameSched
+import geometry
 
 newKeys = []
 heldKeys = []
 keyLock = threading.Lock()
-memGrid = [[0 for i in range(8)]for i in range(8)]
+fb = frameBuffer.FrameBuffer()
 
+WIDTH = frameBuffer.WIDTH
+HEIGHT = frameBuffer.HEIGHT
+CELL = 400//max(WIDTH, HEIGHT)  # px per logical pixel, the window stays around 400px
+REFRESH_MS = 15  # how often the Tk loop paints the latest frame
+frameLock = threading.Lock()
+pendingFrame = None  # newest shown frame that Tk hasn't painted yet
+shownFrame = [0]*frameBuffer.LED_COUNT  # rectangles start black
 
-bttnGrid = [[]for i in range(8)]
+rects = []
 
 
 def startup():
-    global bttnGrid, canvas
+    global rects, canvas, window
 
     window = tk.Tk()
     window.title("YS LED Board Emulator")
 
-    bttnGrid = [[0 for x in range(8)] for y in range(8)]
-    canvas = tk.Canvas(width=400, height=400, bg="blue")
-
-    for y in range(8):
-        for x in range(8):
-            bttnGrid[x][y] = canvas.create_rectangle(
-                x*50, (7-y)*50, x*50+50, (7-y)*50+50, fill='#000000', outline='#FFFFFF')
+    canvas = tk.Canvas(width=HEIGHT*CELL, height=WIDTH*CELL, bg="blue")
+
+    # the emulator shows pixel (x, y) in column y, row WIDTH-1-x, so each strip
+    # run is a half pixel wide column and its LEDs go up the screen
+    runWidth = CELL/geometry.LEDS_Y
+    ledHeight = CELL/geometry.LEDS_X
+    bottom = WIDTH*CELL
+    rects = []
+    for n in range(frameBuffer.LED_COUNT):
+        line, col = divmod(fb.canvasMap[n], frameBuffer.LED_COLS)
+        rects.append(canvas.create_rectangle(
+            line*runWidth, bottom-(col+1)*ledHeight, (line+1)*runWidth, bottom-col*ledHeight,
+            fill='#000000', width=0))
+    for y in range(HEIGHT):
+        for x in range(WIDTH):
+            canvas.create_rectangle(
+                y*CELL, (WIDTH-1-x)*CELL, y*CELL+CELL, (WIDTH-1-x)*CELL+CELL, fill='', outline='#FFFFFF')
     canvas.bind("<Button-1>", lambda a: bttnPress(a))
     canvas.bind("<ButtonRelease-1>", lambda a: bttnRelease(a))
     canvas.pack()
+    window.after(REFRESH_MS, paint)
 
 
-def block():
+def block(thread=None):
+    """Runs the Tk main loop until the window closes, then stops the mode <thread>"""
     try:
         tk.mainloop()
     except KeyboardInterrupt:
         setCol()
+    frameSched.stop()
+    if(thread is not None):
+        thread.join(timeout=2)
 
 
 def drawGrid(grid):
-    for y, row in enumerate(grid):
-        for x, val in enumerate(row):
-            drawPixel(x, y, val)
+    fb.loadGrid(grid)
+    stripShow()
+
+
+def drawFrame(frame):
+    """Writes a flat list of RGB values for every pixel (index y*WIDTH+x) to the emulator"""
+    fb.load(frame)
     stripShow()
 
 
 def drawPixel(x, y, c):
-    memGrid[y][x] = c
+    fb.drawPixel(x, y, c)
+
+
+def setCol(c=0, n=None):
+    fb.fill(c, n)
+    stripShow()
+
+
+def setLED(n, c):
+    fb.setLED(n, c)
+
+
+def drawCanvas(canvas):
+    """Writes a flat list of RGB values for every LED (index line*LED_COLS+col) to the emulator"""
+    fb.loadCanvas(canvas)
+    stripShow()
 
 
-def setCol(c=0, n=range(384)):
-    for x in range(8):
-        for y in range(8):
-            drawPixel(x, y, c)
+def drawLeds(leds):
+    """Writes RGB values for every LED already in strip order to the emulator"""
+    fb.loadLeds(leds)
     stripShow()
 
 
 def stripShow():
-    global canvas
-    for y, row in enumerate(memGrid):
-        for x, val in enumerate(row):
-            canvas.itemconfigure(bttnGrid[y][x], fill="#{:06x}".format(val))
+    """Queues the frame for the Tk loop. Frames shown faster than Tk paints
+    replace each other, only the newest is painted."""
+    global pendingFrame
+    frame = fb.ledFrame()[:]
+    with frameLock:
+        pendingFrame = frame
+
+
+@lru_cache(maxsize=2*frameBuffer.LED_COUNT)  # two frames of all different colors
+def hexColor(c):
+    """Tk's color string for <c>, kept for the colors shown most recently"""
+    return "#{:06x}".format(c)
+
+
+def paint():
+    """Runs on the Tk loop, recoloring only the LEDs whose color changed"""
+    global pendingFrame
+    with frameLock:
+        frame = pendingFrame
+        pendingFrame = None
+    if(frame is not None):
+        dirty = [i for i, (c, old) in enumerate(zip(frame, shownFrame)) if c != old]
+        for i in dirty:
+            c = frame[i]
+            shownFrame[i] = c
+            canvas.itemconfigure(rects[i], fill=hexColor(c))
+    window.after(REFRESH_MS, paint)
 
 
 def readKeys():
@@ -71,9 +139,14 @@ def readKeys():
 
 
 def bttnPress(a):
+    """Presses the key under the click, the keypad only covers the bottom left
+    like on the real board"""
+    key = (WIDTH-1-int(a.y/CELL), int(a.x/CELL))
+    if(max(key) >= geometry.KEYPAD_SIZE):
+        return
     with keyLock:
-        newKeys.append((7-int(a.y/50), int(a.x/50)))
-        heldKeys.append((7-int(a.y/50), int(a.x/50)))
+        newKeys.append(key)
+        heldKeys.append(key)
 
 
 def bttnRelease(a):
@@ -0,0 +1,194 @@
+WIN = 1000  # score of a won position, plus the cells still free so faster wins score higher
+INF = 4*WIN
+# how a table score bounds the true one, alpha-beta cutoffs only give a bound
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+def winMasks(size, k):
+    """Masks of every line of <k> cells on a <size> x <size> board, cell index y*size+x"""
+    masks = []
+    for y in range(size):
+        for x in range(size):
+            for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1)):
+                ex = x+dx*(k-1)
+                ey = y+dy*(k-1)
+                if(0 <= ex < size and 0 <= ey < size):
+                    masks.append(sum(1 << ((y+dy*i)*size+x+dx*i) for i in range(k)))
+    return masks
+
+
+class Engine:
+    """k in a row on a size x size board, each player's stones kept as one int
+    bitmask, so a win is a mask compare against the lines through the last move.
+    By default reply() plays perfectly from a table of every reachable position's
+    exact score, which for 3x3 is filled once when the engine is made, so a
+    reply is a lookup. Give bigger boards a <depth> to search that many moves
+    ahead with alpha-beta instead, then only cells next to a stone are tried and
+    the search deepens one move at a time, trying the best cell of the shallower
+    search first."""
+
+    def __init__(self, size=3, k=3, depth=None):
+        self.size = size
+        self.k = k
+        self.cells = size*size
+        self.full = (1 << self.cells)-1
+        self.wins = winMasks(size, k)
+        # the lines through each cell, a move can only complete one of these
+        self.cellWins = [[m for m in self.wins if m >> cell & 1] for cell in range(self.cells)]
+        # cells with the most lines through them first, the usual best moves
+        self.order = sorted(range(self.cells), key=lambda cell: -len(self.cellWins[cell]))
+        col0 = sum(1 << y*size for y in range(size))
+        self.notFirst = self.full & ~col0  # all but column 0
+        self.notLast = self.full & ~(col0 << size-1)
+        self.depth = self.cells if depth is None else depth
+        self.exact = self.depth >= self.cells
+        # for the player to move, (mover, other) -> (score, cell) when exact,
+        # otherwise (mover, other, depth) -> (score, cell, bound)
+        self.table = {}
+        self.bestMoves = {}  # (mover, other) -> best cell of the deepest search so far
+        self.reset()
+        if(self.exact and self.cells <= 9):
+            self.solve(0, 0)
+
+    def reset(self, first=0):
+        """Empties the board, player <first> (0 or 1) moves next"""
+        self.boards = [0, 0]
+        self.turn = first
+        if(not self.exact):
+            self.table.clear()  # depth limited scores only hold for one game
+            self.bestMoves.clear()
+
+    def cell(self, x, y):
+        return y*self.size+x
+
+    def owner(self, cell):
+        """1 or 2 for the player with a stone on <cell>, 0 if it's empty"""
+        bit = 1 << cell
+        return 1 if self.boards[0] & bit else (2 if self.boards[1] & bit else 0)
+
+    def free(self):
+        return self.full & ~(self.boards[0] | self.boards[1])
+
+    def winLine(self, board, cell):
+        """The line through <cell> that <board> completes, 0 if none"""
+        for m in self.cellWins[cell]:
+            if(board & m == m):
+                return m
+        return 0
+
+    def play(self, cell):
+        """Puts the next player's stone on <cell>, returning the line it won, or 0"""
+        if(not self.free() >> cell & 1):
+            raise ValueError("cell {} is taken".format(cell))
+        board = self.boards[self.turn] | 1 << cell
+        self.boards[self.turn] = board
+        self.turn ^= 1
+        return self.winLine(board, cell)
+
+    def reply(self):
+        """The cell the player to move should take"""
+        mover, other = self.boards[self.turn], self.boards[self.turn ^ 1]
+        if(self.exact):
+            return self.solve(mover, other)[1]
+        for depth in range(1, self.depth):  # cheap, and orders the deep search
+            self.search(mover, other, depth)
+        return self.search(mover, other, self.depth)[1]
+
+    def solve(self, mover, other):
+        """(exact score, best cell) for the player with stones <mover> to move,
+        searching every move to the end of the game without cutoffs, so every
+        position it passes through is stored with its exact score too"""
+        key = (mover, other)
+        hit = self.table.get(key)
+        if(hit is not None):
+            return hit
+        free = self.full & ~(mover | other)
+        best = 0
+        bestCell = None
+        if(free):
+            left = bin(free).count("1")
+            best = -INF
+            for cell in self.order:
+                if(not free >> cell & 1):
+                    continue
+                board = mover | 1 << cell
+                if(self.winLine(board, cell)):
+                    best, bestCell = WIN+left, cell
+                    break  # nothing beats winning now
+                score = -self.solve(other, board)[0]
+                if(score > best):
+                    best, bestCell = score, cell
+        self.table[key] = (best, bestCell)
+        return (best, bestCell)
+
+    def candidates(self, mover, other, free):
+        """The free cells worth trying next to a stone, in the order to try them"""
+        stones = mover | other
+        if(not stones):
+            return [self.order[0]]
+        row = stones | (stones << 1 & self.notFirst) | (stones >> 1 & self.notLast)
+        free &= row | row << self.size | row >> self.size
+        cells = [cell for cell in self.order if free >> cell & 1]
+        best = self.bestMoves.get((mover, other))
+        if(best is not None and best in cells):
+            cells.remove(best)
+            cells.insert(0, best)
+        return cells
+
+    def search(self, mover, other, depth, alpha=-INF, beta=INF):
+        """(score, best cell) for the player with stones <mover> to move, looking
+        <depth> moves ahead with alpha-beta. The position must not be won already.
+        Scores outside alpha to beta are only bounds, enough to know the move
+        isn't chosen."""
+        key = (mover, other, depth)
+        hit = self.table.get(key)
+        if(hit is not None):
+            score, cell, bound = hit
+            if(bound == EXACT or (bound == LOWER and score >= beta)
+               or (bound == UPPER and score <= alpha)):
+                return (score, cell)
+        free = self.full & ~(mover | other)
+        if(not free):
+            self.table[key] = (0, None, EXACT)
+            return (0, None)
+        if(depth == 0):
+            score = self.evaluate(mover, other)
+            self.table[key] = (score, None, EXACT)
+            return (score, None)
+        left = bin(free).count("1")
+        cells = self.candidates(mover, other, free)
+        for cell in cells:
+            if(self.winLine(mover | 1 << cell, cell)):
+                self.table[key] = (WIN+left, cell, EXACT)
+                return (WIN+left, cell)  # nothing beats winning now
+        # if the other player wins next move anywhere, only blocking there can help
+        threats = [cell for cell in cells if self.winLine(other | 1 << cell, cell)]
+        if(threats):
+            cells = threats
+        start = alpha
+        best = -INF
+        bestCell = None
+        for cell in cells:
+            score = -self.search(other, mover | 1 << cell, depth-1, -beta, -alpha)[0]
+            if(score > best):
+                best, bestCell = score, cell
+                if(best > alpha):
+                    alpha = best
+                    if(alpha >= beta):
+                        break
+        bound = UPPER if best <= start else (LOWER if best >= beta else EXACT)
+        self.table[key] = (best, bestCell, bound)
+        self.bestMoves[(mover, other)] = bestCell
+        return (best, bestCell)
+
+    def evaluate(self, mover, other):
+        """Lines still open to the mover minus those open to the other player"""
+        score = 0
+        for m in self.wins:
+            if(not m & other and m & mover):
+                score += 1
+            elif(not m & mover and m & other):
+                score -= 1
+        return score
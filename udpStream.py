@@ -0,0 +1,111 @@
+"""Receives frames rendered elsewhere as DDP (Distributed Display Protocol)
+packets over UDP, e.g. from a desktop visualiser or over loopback for testing.
+
+A packet is a 10 byte header, flags, sequence, type, destination, a 4 byte data
+offset and a 2 byte data length, all big endian, followed by RGB bytes. A frame
+is shown once a packet with the push flag lands. 3*WIDTH*HEIGHT bytes of frame
+are the logical pixels (index y*WIDTH+x, 192 bytes on one 8x8 panel), anything
+longer is the LED canvas (index line*LED_COLS+col), and a canvas can span
+several packets."""
+import os
+import socket
+import struct
+from array import array
+
+import frameBuffer
+from colorTables import blueByte, greenByte, redByte
+
+PORT = int(os.environ.get("LEDBOARD_UDP_PORT", 4048))  # the usual DDP port
+HOST = "0.0.0.0"  # address receivers bind to
+HEADER = struct.Struct(">BBBBIH")
+VERSION_MASK = 0xC0
+VERSION_1 = 0x40
+PUSH = 0x01
+MAX_PACKET = 1500  # one ethernet frame, a whole 8x8 canvas fits in one packet
+IDLE = 5  # seconds without a frame before the stream mode gives up
+PIXEL_BYTES = 3*frameBuffer.WIDTH*frameBuffer.HEIGHT
+
+
+class DdpReceiver:
+    """Non blocking DDP listener. Packets are read with recv_into into one
+    preallocated buffer and their payload copied into the frame being built,
+    the RGB bytes are then spread into the color array by strided slice copies,
+    so no per pixel python runs for a frame. Sequence numbers 1-15 order the
+    frames, packets from a frame older than the one being built are dropped."""
+
+    def __init__(self, port=None, host=None):
+        """Listens on <port> of <host>, by default the module's PORT and HOST as
+        they are when the receiver is made"""
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((HOST if host is None else host, PORT if port is None else port))
+        self.sock.setblocking(False)
+        self.packet = bytearray(MAX_PACKET)
+        self.packetView = memoryview(self.packet)
+        self.rgb = bytearray(3*frameBuffer.LED_COUNT)  # frame being assembled
+        self.rgbView = memoryview(self.rgb)
+        self.size = 0  # bytes of the frame received so far
+        self.seq = 0  # sequence number of the frame being assembled, 0 if unsequenced
+        self.pixels = array('I', bytes(4*frameBuffer.WIDTH*frameBuffer.HEIGHT))
+        self.canvas = array('I', bytes(4*frameBuffer.LED_COUNT))
+        self.frames = 0
+        self.dropped = 0
+
+    def close(self):
+        self.sock.close()
+
+    def poll(self):
+        """Reads every waiting packet, returning the newest complete frame, an
+        array of logical pixels or canvas colors, or None if none completed.
+        The arrays are reused, copy them to keep them."""
+        frame = None
+        while(True):
+            try:
+                n = self.sock.recv_into(self.packet)
+            except BlockingIOError:
+                return frame
+            if(n < HEADER.size):
+                self.dropped += 1
+                continue
+            flags, seq, __, __, offset, length = HEADER.unpack_from(self.packet)
+            seq &= 0x0F
+            if(flags & VERSION_MASK != VERSION_1 or offset+length > len(self.rgb)
+               or HEADER.size+length > n):
+                self.dropped += 1
+                continue
+            if(seq and self.seq and seq != self.seq):
+                if((seq-self.seq) % 15 >= 8):  # behind the frame being built
+                    self.dropped += 1
+                    continue
+                self.size = 0  # a newer frame started, drop what's left of the last
+            if(seq):
+                self.seq = seq
+            self.rgbView[offset:offset+length] = self.packetView[HEADER.size:HEADER.size+length]
+            self.size = max(self.size, offset+length)
+            if(flags & PUSH):
+                frame = self.unpack()
+                self.frames += 1
+                self.size = 0
+
+    def unpack(self):
+        """Spreads the assembled RGB bytes into the pixel or canvas colors"""
+        out = self.pixels if self.size <= PIXEL_BYTES else self.canvas
+        count = len(out)
+        dst = memoryview(out).cast('B')
+        src = self.rgbView[:3*count]
+        dst[redByte::4] = src[0::3]
+        dst[greenByte::4] = src[1::3]
+        dst[blueByte::4] = src[2::3]
+        return out
+
+
+def packets(frame, seq=0, maxData=MAX_PACKET-HEADER.size):
+    """Encodes a sequence of colors as DDP packets, the last one pushing. For
+    senders and tests, e.g. sock.sendto(p, ("127.0.0.1", PORT)) for p in packets(frame)"""
+    data = b"".join(c.to_bytes(3, "big") for c in frame)
+    out = []
+    for offset in range(0, len(data), maxData):
+        chunk = data[offset:offset+maxData]
+        flags = VERSION_1 | (PUSH if offset+maxData >= len(data) else 0)
+        out.append(HEADER.pack(flags, seq & 0x0F, 1, 1, offset, len(chunk)) + chunk)
+    return out
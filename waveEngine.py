@@ -0,0 +1,73 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from math import sqrt
+from operator import itemgetter
+
+import colorTables
+
+MAX_RADIUS = 10  # waves are dropped once they grow past this
+REACH = sqrt(.65/.8)  # a wave lights cells less than this far from its radius
+
+
+def waveRadii():
+    """Radius of a wave on each frame after its seed was pressed"""
+    radii = []
+    r = 0.0
+    while(r <= MAX_RADIUS):
+        r = r*1.03+.14
+        radii.append(r)
+    return radii
+
+
+class WaveEngine:
+    """Renders circular waves for any number of seeds. A wave's radius only
+    depends on its age, so the lit ring for every key position and age is
+    precomputed as a brightness per pixel, and seeds pressed on the same key in
+    the same frame are merged into one. A wave's frame is then a lookup in its
+    color's shade table and waves are summed a whole frame at a time."""
+
+    def __init__(self, width=8, height=8):
+        self.width = width
+        self.height = height
+        self.radii = waveRadii()
+        # rings[pos][age] gets every cell's color from a shade table, at its
+        # 0-255 brightness in the wave, filled in on the first press of each key
+        self.rings = [None]*(width*height)
+        self.seeds = {}  # (pos, birth frame) -> summed seed color
+        self.frame = 0
+
+    def _buildRings(self, px, py):
+        radii = self.radii
+        rings = [bytearray(self.width*self.height) for r in radii]
+        for y in range(self.height):
+            for x in range(self.width):
+                d = sqrt((px-x)**2+(py-y)**2)
+                # only the ages whose radius is within reach light the cell
+                for age in range(bisect_left(radii, d-REACH), bisect_right(radii, d+REACH)):
+                    weight = .65-.8*(d-radii[age])**2
+                    if(weight > 0):
+                        rings[age][y*self.width+x] = round(255*weight)  # at most .65
+        return [itemgetter(*ring) for ring in rings]
+
+    def addSeed(self, x, y, col):
+        """Starts a wave from (x, y) in color <col> on the next step"""
+        pos = y*self.width+x
+        if(self.rings[pos] is None):
+            self.rings[pos] = self._buildRings(x, y)
+        key = (pos, self.frame)
+        self.seeds[key] = colorTables.sumColors(self.seeds.get(key, 0), col)
+
+    def step(self):
+        """Advances every wave one frame, returning the frame as an array of
+        colors (index y*width+x), each channel saturating at 255"""
+        waves = []
+        lifetime = len(self.radii)
+        for key, col in list(self.seeds.items()):
+            pos, born = key
+            age = self.frame-born
+            if(age >= lifetime):
+                del self.seeds[key]
+                continue
+            waves.append(array('I', self.rings[pos][age](colorTables.shadeLut(col))))
+        self.frame += 1
+        return colorTables.sumFrames(waves, self.width*self.height)